@@ -1,40 +1,13 @@
-from flask import Flask, request, redirect, url_for, render_template_string, Response, jsonify, flash
-import sqlite3, csv
-from datetime import datetime
-from twilio.rest import Client  # Twilio SMS
+from flask import Flask, request, redirect, url_for, render_template_string, flash
 from geopy.geocoders import Nominatim
+from waterquality import db, service
+from waterquality.fastjson import FastJSONProvider
+from waterquality.views import bp, cached_page
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = "replace_this_with_random_secret"
 
-DB_PATH = "readings.db"
-
-DEFAULT_THRESH = {
-    "pH_low": 6.5,
-    "pH_high": 8.5,
-    "turbidity_high": 1.0,
-    "rfc_low": 0.2,
-}
-
-# --- Twilio Config ---
-TWILIO_ACCOUNT_SID = "your_account_sid"
-TWILIO_AUTH_TOKEN = "your_auth_token"
-TWILIO_PHONE_NUMBER = "+1234567890"
-TARGET_PHONE_NUMBER = "+91xxxxxxxxxx"
-
-def send_sms_alert(level, issues, timestamp):
-    if level in ["CRITICAL", "HIGH"]:
-        body = f"🚨 Water Alert [{level}] at {timestamp}\n" + "\n".join(f"• {i}" for i in issues)
-        try:
-            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=body,
-                from_=TWILIO_PHONE_NUMBER,
-                to=TARGET_PHONE_NUMBER
-            )
-        except Exception as e:
-            print("SMS failed:", e)
-
 def get_lat_lon_from_city(city_name):
     try:
         geolocator = Nominatim(user_agent="water_quality_app")
@@ -45,97 +18,6 @@ def get_lat_lon_from_city(city_name):
         print("Geocoding failed:", e)
     return None, None
 
-# --- DB helpers ---
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TEXT,
-            pH REAL,
-            turbidity REAL,
-            rfc REAL,
-            tds REAL,
-            status TEXT,
-            lat REAL,
-            lon REAL
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS thresholds (
-            key TEXT PRIMARY KEY,
-            value REAL
-        );
-    """)
-    for k, v in DEFAULT_THRESH.items():
-        c.execute("INSERT OR IGNORE INTO thresholds (key, value) VALUES (?, ?)", (k, v))
-    conn.commit()
-    conn.close()
-
-def get_thresholds():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT key, value FROM thresholds")
-    rows = c.fetchall()
-    conn.close()
-    return {k: v for k, v in rows}
-
-def update_thresholds(new_values):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    for k, v in new_values.items():
-        c.execute("UPDATE thresholds SET value = ? WHERE key = ?", (v, k))
-    conn.commit()
-    conn.close()
-
-def save_reading(pH, turbidity, rfc, tds, status, lat, lon):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    ts = datetime.utcnow().isoformat() + "Z"
-    c.execute("""INSERT INTO readings (ts, pH, turbidity, rfc, tds, status, lat, lon)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-              (ts, pH, turbidity, rfc, tds, status, lat, lon))
-    conn.commit()
-    conn.close()
-    return ts
-
-def get_last_readings(limit=10):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""SELECT ts, pH, turbidity, rfc, tds, status, lat, lon
-                 FROM readings ORDER BY id DESC LIMIT ?""", (limit,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-def get_all_readings():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""SELECT ts, pH, turbidity, rfc, tds, status, lat, lon
-                 FROM readings ORDER BY id DESC""")
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-def evaluate_alert(pH, turbidity, rfc, thresh):
-    issues = []
-    severity = "OK"
-    if pH is not None:
-        if pH < thresh["pH_low"] or pH > thresh["pH_high"]:
-            issues.append(f"pH out of range ({pH})")
-            severity = "HIGH"
-    if turbidity is not None:
-        if turbidity > thresh["turbidity_high"]:
-            issues.append(f"Turbidity high ({turbidity} NTU)")
-            if severity != "HIGH":
-                severity = "MEDIUM"
-    if rfc is not None:
-        if rfc < thresh["rfc_low"]:
-            issues.append(f"Low chlorine ({rfc} mg/L)")
-            severity = "CRITICAL"
-    return severity, issues
-
 # --- Template with multi-page navbar + colored markers ---
 TEMPLATE = """
 <!doctype html>
@@ -174,7 +56,7 @@ TEMPLATE = """
     <a href="{{ url_for('index') }}">🏠 Dashboard</a>
     <a href="{{ url_for('index') }}#add">➕ Add Reading</a>
     <a href="{{ url_for('index') }}#threshold">⚙️ Update Thresholds</a>
-    <a href="{{ url_for('export_csv') }}">📥 Export CSV</a>
+    <a href="{{ url_for('wq.export_csv') }}">📥 Export CSV</a>
 </nav>
 <div class="container">
 
@@ -200,7 +82,7 @@ TEMPLATE = """
 
 <h3 id="threshold">⚙️ Update Thresholds</h3>
 <div class="card">
-  <form method="post" action="{{ url_for('update_thresholds_route') }}">
+  <form method="post" action="{{ url_for('wq.update_thresholds') }}">
     <label>pH Low</label><input type="number" step="0.1" name="pH_low" value="{{ thresh['pH_low'] }}" required>
     <label>pH High</label><input type="number" step="0.1" name="pH_high" value="{{ thresh['pH_high'] }}" required>
     <label>Turbidity High</label><input type="number" step="0.1" name="turbidity_high" value="{{ thresh['turbidity_high'] }}" required>
@@ -234,7 +116,7 @@ TEMPLATE = """
 const map=L.map('map').setView([22.9734,78.6569],5);
 L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png',{maxZoom:19}).addTo(map);
 
-fetch('{{ url_for("geojson") }}').then(r=>r.json()).then(g=>{
+fetch('{{ url_for("wq.geojson") }}').then(r=>r.json()).then(g=>{
   L.geoJSON(g,{
     pointToLayer:(f,latlng)=>{
         let color = 'green';
@@ -257,31 +139,18 @@ fetch('{{ url_for("geojson") }}').then(r=>r.json()).then(g=>{
 
 @app.route("/")
 def index():
-    readings = get_last_readings(10)
-    thresh = get_thresholds()
-    return render_template_string(TEMPLATE, readings=readings, thresh=thresh)
+    return cached_page("index", lambda: render_template_string(
+        TEMPLATE, readings=db.get_last_readings(10), thresh=db.get_thresholds()))
 
 @app.route("/submit", methods=["POST"])
 def submit():
-    def to_float(x):
-        try: return float(x)
-        except: return None
-
-    pH = to_float(request.form.get("pH"))
-    turbidity = to_float(request.form.get("turbidity"))
-    rfc = to_float(request.form.get("rfc"))
-    tds_val = request.form.get("tds")
-    tds = to_float(tds_val) if tds_val not in (None, "") else None
-
+    to_float = service.to_float
     city = request.form.get("city")
     lat, lon = get_lat_lon_from_city(city)
-
-    thresh = get_thresholds()
-    level, issues = evaluate_alert(pH, turbidity, rfc, thresh)
-    ts = save_reading(pH, turbidity, rfc, tds, level, lat, lon)
-
-    if level in ["CRITICAL","HIGH"]:
-        send_sms_alert(level, issues, ts)
+    level, issues = service.record_reading(
+        to_float(request.form.get("pH")), to_float(request.form.get("turbidity")),
+        to_float(request.form.get("rfc")), to_float(request.form.get("tds")),
+        lat, lon, site=service.site_key(city))
 
     if level == "OK":
         flash("Water quality is safe ✅", "OK")
@@ -290,54 +159,8 @@ def submit():
 
     return redirect(url_for("index"))
 
-@app.route("/update_thresholds", methods=["POST"])
-def update_thresholds_route():
-    new_vals={}
-    for key in ["pH_low","pH_high","turbidity_high","rfc_low"]:
-        try: new_vals[key]=float(request.form.get(key))
-        except: pass
-    update_thresholds(new_vals)
-    flash("Thresholds updated ✅", "OK")
-    return redirect(url_for("index"))
-
-@app.route("/export_csv")
-def export_csv():
-    rows=get_all_readings()
-    def generate():
-        data=[["Timestamp","pH","Turbidity","Chlorine","TDS","Status","Lat","Lon"]]+list(rows)
-        for row in data:
-            yield ",".join([str(x) if x is not None else "" for x in row])+"\n"
-    return Response(generate(),mimetype="text/csv",headers={"Content-Disposition":"attachment;filename=readings.csv"})
-
-@app.route("/api/geojson")
-def geojson():
-    rows = get_all_readings()
-    features=[]
-    for ts,pH,turbidity,rfc,tds,status,lat,lon in rows:
-        if lat is None or lon is None: continue
-        features.append({
-          "type":"Feature",
-          "geometry":{"type":"Point","coordinates":[lon,lat]},
-          "properties":{"ts":ts,"pH":pH,"turbidity":turbidity,"rfc":rfc,"tds":tds,"status":status}
-        })
-    return jsonify({"type":"FeatureCollection","features":features})
+app.register_blueprint(bp)
 
 if __name__=="__main__":
-    init_db()
+    db.init_db()
     app.run(debug=True,host="0.0.0.0",port=5000)
-
-
-
-
-
-
-
-                         
-
-
-
-                         
-
-
-
-
@@ -0,0 +1,63 @@
+"""Benchmark /api/geojson serialization: dict + encoder vs. the row writer.
+
+    python bench_geojson.py            # 100k and 1M features
+    python bench_geojson.py 50000      # custom sizes
+"""
+import json, random, sys, time
+from waterquality.fastjson import iter_feature_collection, orjson
+
+def make_rows(n):
+    rnd = random.Random(42)
+    statuses = ["OK", "MEDIUM", "HIGH", "CRITICAL"]
+    return [(f"2024-01-01T00:00:{i % 60:02d}.{i % 1000000:06d}Z",
+             round(rnd.uniform(5.5, 9.5), 2), round(rnd.uniform(0, 3), 2),
+             round(rnd.uniform(0, 1), 2), None if i % 3 else round(rnd.uniform(50, 900), 1),
+             statuses[i % 4], rnd.uniform(8, 35), rnd.uniform(68, 97))
+            for i in range(n)]
+
+def as_dicts(rows):
+    # What the original route built before calling jsonify.
+    features = []
+    for ts, pH, turbidity, rfc, tds, status, lat, lon in rows:
+        if lat is None or lon is None: continue
+        features.append({
+          "type": "Feature",
+          "geometry": {"type": "Point", "coordinates": [lon, lat]},
+          "properties": {"ts": ts, "pH": pH, "turbidity": turbidity, "rfc": rfc, "tds": tds, "status": status}
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+def old_stdlib(rows):
+    # Flask's default provider: compact separators, sorted keys.
+    return json.dumps(as_dicts(rows), separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+def old_orjson(rows):
+    return orjson.dumps(as_dicts(rows))
+
+def row_writer(rows):
+    return b"".join(iter_feature_collection(rows))
+
+def bench(fn, rows, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(rows)
+        best = min(best, time.perf_counter() - t)
+    return best, out
+
+def main(sizes):
+    cases = [("dicts + stdlib json", old_stdlib), ("row writer (stream)", row_writer)]
+    if orjson is not None:
+        cases.insert(1, ("dicts + orjson", old_orjson))
+    for n in sizes:
+        rows = make_rows(n)
+        print(f"\n{n:,} features")
+        base = None
+        for name, fn in cases:
+            secs, out = bench(fn, rows)
+            base = base or secs
+            print(f"  {name:<22} {secs * 1000:9.1f} ms  {len(out) / 1e6:7.1f} MB  x{base / secs:.2f}")
+        assert json.loads(row_writer(rows[:1000])) == json.loads(old_stdlib(rows[:1000]))
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,60 @@
+"""Benchmark ingest parsing: URL-encoded form posts vs. binary batches.
+
+    python bench_ingest.py             # 100k records
+    python bench_ingest.py 1000000
+"""
+import random, sys, time
+from urllib.parse import urlencode, parse_qsl
+from waterquality.binary_ingest import encode_batch, decode_batch
+
+def make_records(n):
+    rnd = random.Random(7)
+    return [(i % 5000, 1700000000 + i, round(rnd.uniform(5.5, 9.5), 2), round(rnd.uniform(0, 3), 2),
+             round(rnd.uniform(0, 1), 2), None if i % 3 else round(rnd.uniform(50, 900), 1))
+            for i in range(n)]
+
+def to_float(x):
+    try: return float(x)
+    except: return None
+
+def parse_forms(bodies):
+    # One /submit body per reading, parsed the way the form route does.
+    out = []
+    for body in bodies:
+        form = dict(parse_qsl(body))
+        tds_val = form.get("tds")
+        out.append((form.get("city"), to_float(form.get("pH")), to_float(form.get("turbidity")),
+                    to_float(form.get("rfc")), to_float(tds_val) if tds_val not in (None, "") else None))
+    return out
+
+def parse_binary(batches):
+    out = []
+    for batch in batches:
+        out.extend(decode_batch(batch))
+    return out
+
+def timed(fn, arg):
+    t = time.perf_counter()
+    out = fn(arg)
+    return time.perf_counter() - t, out
+
+def main(n, batch_size=500):
+    records = make_records(n)
+    forms = [urlencode({"city": f"site-{d}", "pH": pH, "turbidity": tu, "rfc": rfc,
+                        "tds": "" if tds is None else tds})
+             for d, _, pH, tu, rfc, tds in records]
+    chunks = [records[i:i + batch_size] for i in range(0, n, batch_size)]
+    cases = [
+        ("form (1 per POST)", parse_forms, forms, sum(len(f) for f in forms)),
+        (f"binary x{batch_size}", parse_binary, [encode_batch(c) for c in chunks], None),
+        (f"binary x{batch_size} zlib", parse_binary, [encode_batch(c, compress=True) for c in chunks], None),
+    ]
+    print(f"{n:,} readings")
+    for name, fn, payloads, wire in cases:
+        wire = wire or sum(len(p) for p in payloads)
+        secs, out = timed(fn, payloads)
+        assert len(out) == n
+        print(f"  {name:<20} {n / secs / 1e6:6.2f} M rec/s  {wire / n:5.1f} B/rec")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
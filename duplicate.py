@@ -1,137 +1,14 @@
 # app.py
-from flask import Flask, request, redirect, url_for, render_template_string, Response, jsonify
-import sqlite3
-from datetime import datetime
-import os
-from twilio.rest import Client  # Twilio SMS
+from urllib.parse import urlencode
+from flask import Flask, request, redirect, url_for, render_template_string
+from waterquality import db, service
+from waterquality.fastjson import FastJSONProvider
+from waterquality.views import bp, cached_page
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = "replace_this_with_random_secret"
 
-DB_PATH = "readings.db"
-
-DEFAULT_THRESH = {
-    "pH_low": 6.5,
-    "pH_high": 8.5,
-    "turbidity_high": 1.0,
-    "rfc_low": 0.2,
-}
-
-# --- Twilio Config ---
-TWILIO_ACCOUNT_SID = "your_account_sid"
-TWILIO_AUTH_TOKEN = "your_auth_token"
-TWILIO_PHONE_NUMBER = "+1234567890"  # Twilio sender
-TARGET_PHONE_NUMBER = "+91xxxxxxxxxx"  # Your number
-
-def send_sms_alert(level, issues, timestamp):
-    if level in ["CRITICAL", "HIGH"]:
-        body = f"🚨 Water Alert [{level}] at {timestamp}\n" + "\n".join(f"• {i}" for i in issues)
-        try:
-            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=body,
-                from_=TWILIO_PHONE_NUMBER,
-                to=TARGET_PHONE_NUMBER
-            )
-        except Exception as e:
-            print("SMS failed:", e)
-
-# --- DB helpers ---
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TEXT,
-            pH REAL,
-            turbidity REAL,
-            rfc REAL,
-            tds REAL,
-            status TEXT
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS thresholds (
-            key TEXT PRIMARY KEY,
-            value REAL
-        );
-    """)
-    for k, v in DEFAULT_THRESH.items():
-        c.execute("INSERT OR IGNORE INTO thresholds (key, value) VALUES (?, ?)", (k, v))
-    # --- Simple migration: add lat/lon if missing ---
-    c.execute("PRAGMA table_info(readings)")
-    cols = {row[1] for row in c.fetchall()}
-    if "lat" not in cols:
-        c.execute("ALTER TABLE readings ADD COLUMN lat REAL")
-    if "lon" not in cols:
-        c.execute("ALTER TABLE readings ADD COLUMN lon REAL")
-    conn.commit()
-    conn.close()
-
-def get_thresholds():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT key, value FROM thresholds")
-    rows = c.fetchall()
-    conn.close()
-    return {k: v for k, v in rows}
-
-def update_thresholds(new_values):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    for k, v in new_values.items():
-        c.execute("UPDATE thresholds SET value = ? WHERE key = ?", (v, k))
-    conn.commit()
-    conn.close()
-
-def save_reading(pH, turbidity, rfc, tds, status, lat, lon):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    ts = datetime.utcnow().isoformat() + "Z"
-    c.execute("""INSERT INTO readings (ts, pH, turbidity, rfc, tds, status, lat, lon)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-              (ts, pH, turbidity, rfc, tds, status, lat, lon))
-    conn.commit()
-    conn.close()
-    return ts  # return timestamp for alert
-
-def get_last_readings(limit=10):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""SELECT ts, pH, turbidity, rfc, tds, status, lat, lon
-                 FROM readings ORDER BY id DESC LIMIT ?""", (limit,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-def get_all_readings():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""SELECT ts, pH, turbidity, rfc, tds, status, lat, lon
-                 FROM readings ORDER BY id DESC""")
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-def evaluate_alert(pH, turbidity, rfc, thresh):
-    issues = []
-    severity = "OK"
-    if pH is not None:
-        if pH < thresh["pH_low"] or pH > thresh["pH_high"]:
-            issues.append(f"pH out of range ({pH})")
-            severity = "HIGH"
-    if turbidity is not None:
-        if turbidity > thresh["turbidity_high"]:
-            issues.append(f"Turbidity high ({turbidity} NTU)")
-            if severity != "HIGH":
-                severity = "MEDIUM"
-    if rfc is not None:
-        if rfc < thresh["rfc_low"]:
-            issues.append(f"Low chlorine ({rfc} mg/L)")
-            severity = "CRITICAL"
-    return severity, issues
-
 # --- Templates ---
 TEMPLATE = """
 <!doctype html>
@@ -218,6 +95,10 @@ TEMPLATE = """
     </div>
   {% endif %}
 
+  {% for category, msg in get_flashed_messages(with_categories=true) %}
+    <div class="card {{ category|lower }}"><strong>{{ msg }}</strong></div>
+  {% endfor %}
+
   <div class="layout">
     <div class="card">
       <form method="post" action="{{ url_for('submit') }}">
@@ -296,7 +177,7 @@ TEMPLATE = """
       </tbody>
     </table>
     <div style="margin-top:10px;">
-      <a href="{{ url_for('export_csv') }}" class="btn">📥 Export CSV</a>
+      <a href="{{ url_for('wq.export_csv') }}" class="btn">📥 Export CSV</a>
     </div>
   </div>
 
@@ -306,7 +187,7 @@ TEMPLATE = """
 
   <h3>⚙️ Threshold Settings</h3>
   <div class="card">
-    <form method="post" action="{{ url_for('update_thresh') }}">
+    <form method="post" action="{{ url_for('wq.update_thresholds') }}">
       <label>pH Low</label><input type="number" step="0.01" name="pH_low" value="{{ thresh.pH_low }}" required>
       <label>pH High</label><input type="number" step="0.01" name="pH_high" value="{{ thresh.pH_high }}" required>
       <label>Turbidity High</label><input type="number" step="0.01" name="turbidity_high" value="{{ thresh.turbidity_high }}" required>
@@ -354,7 +235,7 @@ TEMPLATE = """
     }
 
     // Load markers
-    fetch('{{ url_for("geojson") }}')
+    fetch('{{ url_for("wq.geojson") }}')
       .then(r => r.json())
       .then(geo => {
         const markers = [];
@@ -391,102 +272,36 @@ TEMPLATE = """
 
 @app.route("/")
 def index():
-    readings = get_last_readings(10)
-    thresh = get_thresholds()
     alert = None
     alert_level = request.args.get("alert_level")
     if alert_level:
         issues = request.args.getlist("issue")
         css_map = {"OK": "ok", "MEDIUM": "medium", "HIGH": "high", "CRITICAL": "critical"}
         alert = { "level": alert_level, "issues": issues, "css": css_map.get(alert_level, "ok") }
-    return render_template_string(TEMPLATE, readings=readings, alert=alert, thresh=thresh)
+    return cached_page("index", lambda: render_template_string(
+        TEMPLATE, readings=db.get_last_readings(10), alert=alert, thresh=db.get_thresholds()))
 
 @app.route("/submit", methods=["POST"])
 def submit():
-    def to_float(x):
-        try:
-            return float(x)
-        except:
-            return None
-    pH = to_float(request.form.get("pH"))
-    turbidity = to_float(request.form.get("turbidity"))
-    rfc = to_float(request.form.get("rfc"))
-    tds_val = request.form.get("tds")
-    tds = to_float(tds_val) if tds_val not in (None, "") else None
-    lat_val = request.form.get("lat")
-    lon_val = request.form.get("lon")
-    lat = to_float(lat_val) if lat_val not in (None, "") else None
-    lon = to_float(lon_val) if lon_val not in (None, "") else None
-
-    thresh = get_thresholds()
-    level, issues = evaluate_alert(pH, turbidity, rfc, thresh)
-    ts = save_reading(pH, turbidity, rfc, tds, level, lat, lon)
-
-    if level in ["CRITICAL", "HIGH"]:
-        send_sms_alert(level, issues, ts)
+    to_float = service.to_float
+    lat = to_float(request.form.get("lat"))
+    lon = to_float(request.form.get("lon"))
+    site = f"{lat:.4f},{lon:.4f}" if lat is not None and lon is not None else None
+    level, issues = service.record_reading(
+        to_float(request.form.get("pH")), to_float(request.form.get("turbidity")),
+        to_float(request.form.get("rfc")), to_float(request.form.get("tds")),
+        lat, lon, site=site)
 
     if issues:
         query = [("alert_level", level)] + [("issue", it) for it in issues]
-        from urllib.parse import urlencode
         return redirect(url_for("index") + "?" + urlencode(query, doseq=True))
     else:
         return redirect(url_for("index"))
 
-@app.route("/export")
-def export_csv():
-    readings = get_all_readings()
-    def generate():
-        data = [["Timestamp", "pH", "Turbidity", "Chlorine", "TDS", "Status", "Lat", "Lon"]]
-        data += readings
-        output = []
-        for row in data:
-            output.append(",".join([str(x) if x is not None else "" for x in row]))
-        return "\n".join(output)
-    return Response(generate(), mimetype="text/csv",
-                    headers={"Content-Disposition": "attachment;filename=readings.csv"})
-
-@app.route("/update_thresholds", methods=["POST"])
-def update_thresh():
-    try:
-        new_values = {
-            "pH_low": float(request.form.get("pH_low")),
-            "pH_high": float(request.form.get("pH_high")),
-            "turbidity_high": float(request.form.get("turbidity_high")),
-            "rfc_low": float(request.form.get("rfc_low")),
-        }
-        update_thresholds(new_values)
-    except Exception as e:
-        print("Threshold update failed:", e)
-    return redirect(url_for("index"))
-
-# --- GeoJSON API for map ---
-@app.route("/api/geojson")
-def geojson():
-    rows = get_all_readings()
-    features = []
-    for ts, pH, turbidity, rfc, tds, status, lat, lon in rows:
-        if lat is None or lon is None:
-            continue
-        features.append({
-            "type": "Feature",
-            "geometry": {"type": "Point", "coordinates": [lon, lat]},
-            "properties": {
-                "ts": ts, "pH": pH, "turbidity": turbidity, "rfc": rfc,
-                "tds": tds, "status": status
-            }
-        })
-    return jsonify({"type": "FeatureCollection", "features": features})
-
-# Backward-compatible alias used by the template
-@app.route("/api/readings.geojson")
-def geojson_alias():
-    return geojson()
-
-# Jinja url_for reference used above
-@app.context_processor
-def inject_urls():
-    return {"geojson": "geojson"}
+# Threshold updates, CSV export (/export), GeoJSON (/api/readings.geojson)
+# and the JSON APIs come from the shared blueprint.
+app.register_blueprint(bp)
 
 if __name__ == "__main__":
-    init_db()
-    app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
+    db.init_db()
+    app.run(debug=True, host="0.0.0.0", port=5000)
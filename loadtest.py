@@ -0,0 +1,197 @@
+"""Built-in load generator for the water quality app.
+
+Drives the real Flask handlers in-process from N worker threads, each with
+its own test client, against a scratch SQLite file. SMS and geocoding are
+replaced with stubs so runs are offline and never text anyone. Prints a
+JSON report with throughput, p50/p95/p99 latency and lock-error rate per
+endpoint, for each concurrency level, plus lock errors and failures from
+the background re-score thread.
+
+    python loadtest.py --concurrency 1,4,16 --duration 10
+    python loadtest.py --mix submit=50,index=30,geojson=15,thresholds=5 --seed-rows 50000
+"""
+import argparse, json, os, random, sqlite3, sys, tempfile, threading, time
+from datetime import datetime, timedelta
+
+import app as wq
+from waterquality import alerts, db, service
+from waterquality.alerts import evaluate_alert
+from waterquality.binary_ingest import encode_batch
+
+DEFAULT_MIX = "submit=60,index=25,geojson=14,thresholds=1"
+CITIES = [f"site-{i}" for i in range(200)]
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+# --- Endpoint drivers: each issues one request with a test client ---
+def do_submit(client, rnd):
+    return client.post("/submit", data={
+        "city": rnd.choice(CITIES), "pH": f"{rnd.uniform(5.5, 9.5):.2f}",
+        "turbidity": f"{rnd.uniform(0, 2):.2f}", "rfc": f"{rnd.uniform(0, 1):.2f}",
+        "tds": f"{rnd.uniform(50, 900):.1f}" if rnd.random() < 0.5 else ""})
+
+def do_index(client, rnd):
+    return client.get("/")
+
+def do_geojson(client, rnd):
+    return client.get("/api/geojson")
+
+def do_export(client, rnd):
+    return client.get("/export_csv")
+
+def do_series(client, rnd):
+    return client.get(f"/api/series?metric={rnd.choice(db.SERIES_METRICS)}&points=500")
+
+def do_thresholds(client, rnd):
+    return client.post("/update_thresholds", data={
+        "pH_low": f"{rnd.uniform(6.3, 6.7):.1f}", "pH_high": f"{rnd.uniform(8.3, 8.7):.1f}",
+        "turbidity_high": "1.0", "rfc_low": "0.2"})
+
+def do_ingest(client, rnd):
+    now = int(time.time())
+    batch = [(rnd.randrange(1000), now, rnd.uniform(5.5, 9.5), rnd.uniform(0, 2), rnd.uniform(0, 1), None)
+             for _ in range(50)]
+    return client.post("/ingest/bin", data=encode_batch(batch), content_type="application/octet-stream")
+
+ENDPOINTS = {
+    "submit": do_submit, "index": do_index, "geojson": do_geojson, "export": do_export,
+    "series": do_series, "thresholds": do_thresholds, "ingest": do_ingest,
+}
+
+# --- Setup ---
+def install_stubs(sms_log):
+    alerts.send_sms_alert = lambda level, issues, ts: sms_log.append(level)
+    wq.get_lat_lon_from_city = lambda city: (
+        8 + (hash(city) % 2700) / 100.0, 68 + (hash(city[::-1]) % 2900) / 100.0)
+    service.heartbeat.on_missing = lambda site, silent_for: None
+    wq.app.config["PROPAGATE_EXCEPTIONS"] = True
+
+def seed(db_path, rows):
+    db.DB_PATH = db_path
+    db.init_db()
+    if not rows:
+        return
+    rnd = random.Random(0)
+    start = datetime.utcnow() - timedelta(minutes=rows)
+    thresh = db.get_thresholds()
+    data = []
+    for i in range(rows):
+        pH, tu, rfc = rnd.uniform(5.5, 9.5), rnd.uniform(0, 2), rnd.uniform(0, 1)
+        level, _ = evaluate_alert(pH, tu, rfc, thresh)
+        data.append(((start + timedelta(minutes=i)).isoformat() + "Z", pH, tu, rfc, None, level,
+                     rnd.uniform(8, 35), rnd.uniform(68, 97), None))
+    db.save_readings(data)
+
+# --- Run ---
+def worker(mix, deadline, results, seed_value):
+    rnd = random.Random(seed_value)
+    names, weights = list(mix), list(mix.values())
+    client = wq.app.test_client()
+    while time.perf_counter() < deadline:
+        name = rnd.choices(names, weights)[0]
+        t = time.perf_counter()
+        outcome = "ok"
+        try:
+            resp = ENDPOINTS[name](client, rnd)
+            resp.get_data()  # drain streamed bodies so their cost is timed
+            if resp.status_code >= 400:
+                outcome = "error"
+            resp.close()
+        except sqlite3.OperationalError as e:
+            outcome = "lock" if "locked" in str(e) else "error"
+        except Exception:
+            outcome = "error"
+        results.append((name, time.perf_counter() - t, outcome))
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+def summarize(results, elapsed):
+    report = {}
+    for name in sorted({r[0] for r in results}) + ["ALL"]:
+        rows = [r for r in results if name == "ALL" or r[0] == name]
+        lat = sorted(r[1] * 1000 for r in rows)
+        locks = sum(1 for r in rows if r[2] == "lock")
+        report[name] = {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 1),
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p95_ms": round(percentile(lat, 95), 2),
+            "p99_ms": round(percentile(lat, 99), 2),
+            "max_ms": round(lat[-1], 2),
+            "errors": sum(1 for r in rows if r[2] == "error"),
+            "lock_errors": locks,
+            "lock_error_rate": round(locks / len(rows), 4),
+        }
+    return report
+
+def background_counts():
+    job = service.rescorer
+    return {"rescore_runs": job.runs, "rescore_lock_errors": job.lock_errors, "rescore_failures": job.failures}
+
+def run_level(concurrency, mix, duration):
+    results = []  # list.append is atomic, so workers share it without a lock
+    before = background_counts()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(mix, deadline, results, i)) for i in range(concurrency)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start
+    # Rescore chunks can still be retrying after the workers stop; this level
+    # counts what happened while it ran.
+    after = background_counts()
+    return {"concurrency": concurrency, "elapsed_s": round(elapsed, 2),
+            "endpoints": summarize(results, elapsed),
+            "background": {k: after[k] - before[k] for k in after}}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--concurrency", default="1,4,16", help="comma-separated worker counts to sweep")
+    p.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    p.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights, from: {', '.join(ENDPOINTS)}")
+    p.add_argument("--seed-rows", type=int, default=10000, help="readings to preload")
+    p.add_argument("--db", help="new or empty SQLite file to use and keep (default: a temporary file); "
+                                "it is seeded and its thresholds are rewritten, so existing data is refused")
+    p.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    args = p.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    if args.db:
+        if os.path.exists(args.db) and os.path.getsize(args.db) > 0:
+            raise SystemExit(f"{args.db} already has data; the load test would overwrite it. "
+                             "Pass a new file name or omit --db.")
+        db_path = args.db
+    else:
+        fd, db_path = tempfile.mkstemp(prefix="wq-load-", suffix=".db")
+        os.close(fd)  # SQLite opens the empty file as a new database
+    sms_log = []
+    install_stubs(sms_log)
+    if args.no_cache:
+        service.response_cache.enabled = False
+    seed(db_path, args.seed_rows)
+    try:
+        levels = [run_level(int(c), mix, args.duration) for c in args.concurrency.split(",")]
+    finally:
+        service.rescorer.cancel()
+        if not args.db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+    json.dump({"mix": mix, "seed_rows": args.seed_rows, "duration_s": args.duration,
+               "cache": not args.no_cache, "sms_stubbed": len(sms_log), "levels": levels},
+              sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """The db module pointed at a fresh, initialised SQLite file."""
+    db = pytest.importorskip("waterquality.db", reason="needs the app's dependencies (twilio)")
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "readings.db"))
+    db.init_db()
+    return db
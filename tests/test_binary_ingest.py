@@ -0,0 +1,56 @@
+import struct, zlib
+
+import pytest
+
+from waterquality.binary_ingest import (
+    HEADER, MAGIC, MAX_RECORDS, RECORD, VERSION, FLAG_ZLIB, BinaryIngestError, decode_batch, encode_batch,
+)
+
+RECORDS = [
+    (1, 1700000000, 7.2, 0.5, 0.3, 120.5),
+    (2, 1700000060, 6.1, None, 0.1, None),
+    (4294967295, 1700000120, 9.0, 2.25, None, 899.0),
+]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(compress):
+    assert list(decode_batch(encode_batch(RECORDS, compress=compress))) == RECORDS
+
+
+def test_empty_batch():
+    assert list(decode_batch(encode_batch([]))) == []
+
+
+def test_non_finite_values_become_missing():
+    body = RECORD.pack(1, 1700000000, float("inf"), float("-inf"), float("nan"), 1.5)
+    data = HEADER.pack(MAGIC, VERSION, 0, 1) + body
+    assert list(decode_batch(data)) == [(1, 1700000000, None, None, None, 1.5)]
+
+
+@pytest.mark.parametrize("data", [
+    b"WQ\x01",                                            # truncated header
+    HEADER.pack(b"XX", VERSION, 0, 0),                    # bad magic
+    HEADER.pack(MAGIC, VERSION + 1, 0, 0),                # unknown version
+    encode_batch(RECORDS)[:-1],                           # truncated record
+    encode_batch(RECORDS) + b"\0",                        # trailing bytes
+    HEADER.pack(MAGIC, VERSION, 0, 5) + RECORD.pack(1, 2, 3, 4, 5, 6),  # count mismatch
+    HEADER.pack(MAGIC, VERSION, FLAG_ZLIB, 1) + b"not zlib",
+    HEADER.pack(MAGIC, VERSION, 0, MAX_RECORDS + 1),
+])
+def test_malformed_batches_are_rejected(data):
+    with pytest.raises(BinaryIngestError):
+        list(decode_batch(data))
+
+
+def test_decompression_bomb_is_rejected():
+    # Claims one record but inflates to 100 MB.
+    bomb = zlib.compress(b"\0" * (100 * 1024 * 1024), 9)
+    data = HEADER.pack(MAGIC, VERSION, FLAG_ZLIB, 1) + bomb
+    with pytest.raises(BinaryIngestError):
+        list(decode_batch(data))
+
+
+def test_header_layout():
+    data = encode_batch(RECORDS, compress=True)
+    assert struct.unpack_from("<2sBBI", data) == (MAGIC, VERSION, FLAG_ZLIB, len(RECORDS))
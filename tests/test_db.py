@@ -0,0 +1,37 @@
+import threading
+
+
+def in_thread(fn):
+    out = []
+    t = threading.Thread(target=lambda: out.append(fn()))
+    t.start(); t.join()
+    return out[0]
+
+
+def test_connection_outlives_request_threads(temp_db):
+    # Each dev-server request runs on a new thread; they should share one connection.
+    first = in_thread(temp_db.connect)
+    assert all(in_thread(temp_db.connect) is first for _ in range(20))
+
+
+def test_concurrent_threads_get_their_own_connections(temp_db):
+    barrier = threading.Barrier(4)
+    conns = []
+
+    def hold():
+        conns.append(temp_db.connect())
+        barrier.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len({id(c) for c in conns}) == 4
+    assert temp_db._pool.qsize() <= temp_db.POOL_SIZE
+
+
+def test_changing_db_path_drops_old_connections(temp_db, tmp_path, monkeypatch):
+    old = in_thread(temp_db.connect)
+    monkeypatch.setattr(temp_db, "DB_PATH", str(tmp_path / "other.db"))
+    new = in_thread(temp_db.connect)
+    assert new is not old
+    assert new.execute("PRAGMA database_list").fetchone()[2].endswith("other.db")
@@ -0,0 +1,51 @@
+import json, math
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from waterquality.fastjson import FastJSONProvider, iter_feature_collection
+
+
+@pytest.fixture
+def provider():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app.json
+
+
+def test_sort_keys_is_honored(provider):
+    assert provider.dumps({"b": 1, "a": 2}) == '{"a":2,"b":1}'
+    provider.sort_keys = False
+    assert provider.dumps({"b": 1, "a": 2}) == '{"b":1,"a":2}'
+
+
+def test_ensure_ascii(provider):
+    assert provider.dumps({"s": "✅"}) == '{"s":"✅"}'
+    provider.ensure_ascii = True
+    assert json.loads(provider.dumps({"s": "✅"})) == {"s": "✅"}
+    assert "\\u2705" in provider.dumps({"s": "✅"})
+
+
+def test_falls_back_for_non_str_keys_and_big_ints(provider):
+    assert json.loads(provider.dumps({1: "a"})) == {"1": "a"}
+    assert json.loads(provider.dumps([2 ** 70])) == [2 ** 70]
+
+
+def test_loads_matches_stdlib(provider):
+    assert provider.loads("[123456789012345678901234567890]") == [123456789012345678901234567890]
+    assert math.isnan(provider.loads("[NaN]")[0])
+
+
+def test_datetimes_match_flask(provider):
+    assert provider.dumps([datetime(2024, 1, 1)]) == '["Mon, 01 Jan 2024 00:00:00 GMT"]'
+
+
+def test_geojson_with_text_in_numeric_column():
+    rows = [("2024-01-01T00:00:00Z", "7,2", 0.5, None, float("nan"), "OK", 18.5, 73.8),
+            ("2024-01-01T00:01:00Z", 7.1, 0.4, 0.3, 120.0, "OK", 18.6, 73.9)]
+    doc = json.loads(b"".join(iter_feature_collection(rows)))
+    props = [f["properties"] for f in doc["features"]]
+    assert [p["pH"] for p in props] == ["7,2", 7.1]
+    assert props[0]["tds"] is None
+    assert doc["features"][1]["geometry"]["coordinates"] == [73.9, 18.6]
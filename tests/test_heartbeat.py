@@ -0,0 +1,89 @@
+import pytest
+
+from waterquality.heartbeat import HeartbeatMonitor
+
+
+def make_monitor(timeout=10, **kw):
+    missing = []
+    mon = HeartbeatMonitor(lambda site, silent_for: missing.append(site), timeout=timeout, **kw)
+    return mon, missing
+
+
+def run_until(mon, t0, seconds):
+    # Drive the wheel by hand, one tick at a time.
+    for i in range(1, int(seconds / mon.tick) + 1):
+        mon.advance(t0 + i * mon.tick)
+
+
+def test_silent_site_is_reported_once():
+    mon, missing = make_monitor()
+    t0 = mon._started
+    mon.watch("well-1", now=t0)
+    run_until(mon, t0, 30)
+    assert missing == ["well-1"]
+    assert mon.status()["missing"] == ["well-1"]
+
+
+def test_reporting_site_is_not_alerted():
+    mon, missing = make_monitor(slots=4)
+    t0 = mon._started
+    mon.watch("well-1", now=t0)
+    for i in range(1, 60):
+        mon.touch("well-1", now=t0 + i)
+        mon.advance(t0 + i)
+    assert missing == []
+
+
+def test_recovery_rearms_site():
+    mon, missing = make_monitor()
+    t0 = mon._started
+    mon.watch("well-1", now=t0)
+    run_until(mon, t0, 15)
+    assert missing == ["well-1"]
+    mon.touch("well-1", now=t0 + 15)
+    assert mon.status()["missing"] == []
+    for i in range(16, 40):
+        mon.advance(t0 + i)
+    assert missing == ["well-1", "well-1"]
+
+
+def test_unwatched_and_forgotten_sites_are_ignored():
+    mon, missing = make_monitor()
+    t0 = mon._started
+    mon.touch("typo-city", now=t0)
+    mon.watch("well-1", now=t0)
+    mon.forget("well-1")
+    run_until(mon, t0, 30)
+    assert missing == []
+    assert mon.sites() == []
+
+
+def test_site_cap():
+    mon, _ = make_monitor(max_sites=2)
+    mon.watch("a")
+    mon.watch("b")
+    mon.watch("a")  # already watched, not counted twice
+    with pytest.raises(ValueError):
+        mon.watch("c")
+    assert mon.sites() == ["a", "b"]
+
+
+def test_check_rearms_site_seen_by_another_process():
+    seen_ago = {"well-1": 2.0}
+    mon, missing = make_monitor(check=seen_ago.get)
+    t0 = mon._started
+    mon.watch("well-1", now=t0)
+    run_until(mon, t0, 15)  # another worker stored a reading 2 s before expiry
+    assert missing == []
+    seen_ago["well-1"] = 100.0
+    run_until(mon, t0 + 15, 30)
+    assert missing == ["well-1"]
+
+
+def test_check_drops_site_removed_elsewhere():
+    mon, missing = make_monitor(check=lambda site: None)
+    t0 = mon._started
+    mon.watch("well-1", now=t0)
+    run_until(mon, t0, 30)
+    assert missing == []
+    assert mon.sites() == []
@@ -0,0 +1,104 @@
+import sqlite3, threading
+
+import pytest
+
+rescore = pytest.importorskip("waterquality.rescore", reason="needs the app's dependencies (twilio)")
+from waterquality.alerts import evaluate_alert
+
+
+def seed(db, values):
+    # Every row starts as "OK"; rfc below the threshold should become CRITICAL.
+    db.save_readings([(f"2024-01-01T00:00:{i:02d}.000000Z", 7.0, 0.1, rfc, None, "OK", None, None, None)
+                      for i, rfc in enumerate(values)])
+
+
+def statuses(db):
+    return [row[0] for row in db.connect().execute("SELECT status FROM readings ORDER BY id")]
+
+
+def test_walks_all_chunks_and_rewrites_only_changed_rows(temp_db):
+    seed(temp_db, [0.1 if i % 3 == 0 else 0.5 for i in range(50)])
+    version = temp_db.data_version()
+    job = rescore.RescoreJob(evaluate_alert, chunk_size=7, pause=0)
+    job.start(temp_db.DB_PATH).join()
+    status = job.status()
+    assert status["state"] == "done"
+    assert status["scanned"] == 50 and status["max_id"] == 50 and status["percent"] == 100.0
+    assert status["changed"] == 17
+    assert statuses(temp_db) == ["CRITICAL" if i % 3 == 0 else "OK" for i in range(50)]
+    assert temp_db.data_version() > version
+
+
+def test_uses_thresholds_stored_when_the_run_starts(temp_db):
+    seed(temp_db, [0.3, 0.5])
+    temp_db.update_thresholds({"rfc_low": 0.4})
+    job = rescore.RescoreJob(evaluate_alert, pause=0)
+    job.start(temp_db.DB_PATH).join()
+    assert statuses(temp_db) == ["CRITICAL", "OK"]
+
+
+def test_rows_after_max_id_are_left_alone(temp_db):
+    seed(temp_db, [0.1] * 5)
+    path = temp_db.DB_PATH
+    inserted = []
+
+    def evaluate(*args):
+        # Runs after max_id was captured: a reading arriving mid-run.
+        if not inserted:
+            with sqlite3.connect(path) as conn:
+                conn.execute("INSERT INTO readings (ts, rfc, status) VALUES ('2024-01-02T00:00:00Z', 0.1, 'NEW')")
+            inserted.append(True)
+        return evaluate_alert(*args)
+
+    job = rescore.RescoreJob(evaluate, chunk_size=2, pause=0)
+    job.start(path).join()
+    assert job.status()["max_id"] == 5
+    assert statuses(temp_db) == ["CRITICAL"] * 5 + ["NEW"]
+
+
+def test_new_run_cancels_the_old_one(temp_db):
+    seed(temp_db, [0.1] * 10)
+    release = threading.Event()
+
+    def slow(*args):
+        release.wait(5)
+        return evaluate_alert(*args)
+
+    job = rescore.RescoreJob(slow, chunk_size=1, pause=0)
+    first = job.start(temp_db.DB_PATH)
+    first_progress = job._progress
+    job.evaluate = evaluate_alert
+    second = job.start(temp_db.DB_PATH)
+    release.set()
+    first.join(); second.join()
+    assert first_progress["state"] == "cancelled"
+    assert first_progress["scanned"] <= 1
+    assert job.status()["state"] == "done"
+    assert statuses(temp_db) == ["CRITICAL"] * 10
+
+
+def test_concurrent_starts_leave_one_run(temp_db):
+    seed(temp_db, [0.1] * 20)
+    runs = []
+
+    class Recording(rescore.RescoreJob):
+        def _run(self, db_path, cancel, progress):
+            runs.append(progress)
+            super()._run(db_path, cancel, progress)
+
+    job = Recording(evaluate_alert, chunk_size=1, pause=0.01)
+    barrier = threading.Barrier(8)
+    threads = []
+
+    def start():
+        barrier.wait()
+        threads.append(job.start(temp_db.DB_PATH))
+
+    starters = [threading.Thread(target=start) for _ in range(8)]
+    for t in starters: t.start()
+    for t in starters: t.join()
+    for t in threads: t.join()
+    assert len(runs) == job.runs == 8
+    assert sorted(p["state"] for p in runs) == ["cancelled"] * 7 + ["done"]
+    assert job.status()["state"] == "done"
+    assert statuses(temp_db) == ["CRITICAL"] * 20
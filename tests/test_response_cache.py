@@ -0,0 +1,132 @@
+import gzip
+
+import pytest
+from flask import Flask, flash, get_flashed_messages, redirect
+
+from waterquality.response_cache import ResponseCache
+
+
+class Version:
+    def __init__(self):
+        self.value = 0
+
+    def __call__(self):
+        return self.value
+
+
+def test_version_bump_makes_entry_stale():
+    version = Version()
+    cache = ResponseCache(version)
+    cache.put("k", version(), b"body", "text/plain")
+    assert cache.get("k").body == b"body"
+    version.value += 1
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0  # stale entries are dropped on sight
+
+
+def test_entry_built_before_a_write_is_never_served():
+    version = Version()
+    cache = ResponseCache(version)
+    built_from = version()
+    version.value += 1  # a write lands while the body is being built
+    cache.put("k", built_from, b"body", "text/plain")
+    assert cache.get("k") is None
+
+
+def test_lru_eviction_by_max_bytes():
+    cache = ResponseCache(Version(), max_bytes=250, compress_min=10**9)
+    for key in "abc":
+        cache.put(key, 0, b"x" * 100, "text/plain")
+    assert cache.get("a") is None  # evicted to make room for "c"
+    assert cache.get("b") is not None  # now most recently used
+    cache.put("d", 0, b"x" * 100, "text/plain")
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
+    assert cache.stats()["bytes"] == 200
+
+
+def test_gzip_copy_for_large_bodies():
+    cache = ResponseCache(Version(), compress_min=100)
+    assert cache.put("small", 0, b"x" * 99, "text/plain").gzip_body is None
+    entry = cache.put("large", 0, b"x" * 1000, "text/plain")
+    assert gzip.decompress(entry.gzip_body) == b"x" * 1000
+
+
+def test_oversized_entries_are_returned_but_not_stored():
+    cache = ResponseCache(Version(), max_entry_bytes=10, compress_min=1)
+    entry = cache.put("k", 0, b"x" * 11, "text/plain")
+    assert entry.body == b"x" * 11 and entry.gzip_body is None
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_stores_and_compresses_nothing():
+    cache = ResponseCache(Version(), compress_min=1, enabled=False)
+    entry = cache.put("k", 0, b"x" * 1000, "text/plain")
+    assert entry.gzip_body is None
+    assert cache.get("k") is None
+    assert cache.stats() == {"enabled": False, "entries": 0, "bytes": 0, "hits": 0, "misses": 0}
+
+
+# --- The cache as used by the shared views ---
+
+@pytest.fixture
+def client(temp_db):
+    views = pytest.importorskip("waterquality.views")
+    from waterquality import service
+    service.response_cache.clear()
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(views.bp)
+    renders = []
+
+    @app.route("/")
+    def index():
+        def render():
+            renders.append(1)
+            return "<p>page</p>" + "".join(get_flashed_messages())
+        return views.cached_page("index", render)
+
+    @app.route("/flash")
+    def with_flash():
+        flash("hello", "OK")
+        return redirect("/")
+
+    client = app.test_client()
+    client.renders = renders
+    client.cache = service.response_cache
+    yield client
+    service.response_cache.clear()
+
+
+def test_cached_page_is_rendered_once_until_a_write(client, temp_db):
+    client.get("/"); client.get("/")
+    assert len(client.renders) == 1
+    temp_db.save_readings([("2024-01-01T00:00:00.000000Z", 7.0, 0.1, 0.5, None, "OK", None, None, None)])
+    client.get("/")
+    assert len(client.renders) == 2
+
+
+def test_pages_with_flash_messages_bypass_the_cache(client):
+    client.get("/")       # cached, without the message
+    client.get("/flash")  # the message is now pending in the session
+    assert b"hello" in client.get("/").data  # rendered for this user, not cached or served from cache
+    assert client.get("/").data == b"<p>page</p>"
+    assert len(client.renders) == 2
+    assert client.cache.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("path", ["/export_csv", "/api/geojson"])
+def test_streamed_body_is_cached_only_when_fully_sent(client, temp_db, path):
+    temp_db.save_readings([(f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}.000000Z", 7.0, 0.1, 0.5, None, "OK",
+                            18.5, 73.8, None) for i in range(2500)])
+    resp = client.get(path, buffered=False)
+    next(iter(resp.response))  # client goes away after the first chunk
+    resp.close()
+    assert client.cache.stats()["entries"] == 0
+
+    body = client.get(path).get_data()
+    assert client.cache.stats()["entries"] == 1
+    cached = client.get(path)
+    assert cached.get_data() == body
+    assert client.cache.stats()["hits"] >= 1
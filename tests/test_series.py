@@ -0,0 +1,75 @@
+import math, random, sqlite3
+
+import pytest
+
+from waterquality.series import lttb, minmax_buckets, parse_time
+
+
+def make_series(n, seed=0):
+    rnd = random.Random(seed)
+    t = 1700000000.0
+    points = []
+    for i in range(n):
+        t += rnd.uniform(1, 600)
+        points.append((t, math.sin(i / 50.0) + rnd.uniform(-0.1, 0.1), f"ts{i}", "OK"))
+    return points
+
+
+@pytest.mark.parametrize("n_points, n", [(10000, 3), (10000, 100), (10000, 1000), (50, 1000), (1, 10)])
+def test_lttb_output_is_bounded_and_keeps_ends(n_points, n):
+    points = make_series(n_points)
+    out = list(lttb(iter(points), points[0][0], points[-1][0], n))
+    assert len(out) <= n
+    assert out[0] is points[0] and out[-1] is points[-1]
+    assert [p[0] for p in out] == sorted(p[0] for p in out)
+
+
+def test_lttb_keeps_spike():
+    points = [(float(t), 0.0) for t in range(5000)]
+    points[2500] = (2500.0, 100.0)
+    assert (2500.0, 100.0) in list(lttb(iter(points), 0.0, 4999.0, 50))
+
+
+def test_lttb_range_end_past_last_bucket():
+    # Points exactly at t1 must not open a bucket beyond n - 2.
+    points = [(float(t), float(t % 7)) for t in range(1001)]
+    assert len(list(lttb(iter(points), 0.0, 1000.0, 11))) <= 11
+
+
+def test_lttb_empty():
+    assert list(lttb(iter([]), 0.0, 1.0, 10)) == []
+
+
+@pytest.mark.parametrize("n", [3, 10, 101, 1000])
+def test_minmax_output_is_bounded_and_keeps_extremes(n):
+    db = pytest.importorskip("waterquality.db")  # needs the app's dependencies (twilio)
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE readings (id INTEGER PRIMARY KEY, ts TEXT, pH REAL, turbidity REAL, rfc REAL, tds REAL, status TEXT)")
+    rows = [(f"2024-01-{1 + i // 1440:02d}T{i // 60 % 24:02d}:{i % 60:02d}:00Z", 7 + math.sin(i / 30.0))
+            for i in range(5000)]
+    rows[1234] = (rows[1234][0], 14.0)
+    conn.executemany("INSERT INTO readings (ts, pH, status) VALUES (?, ?, 'OK')", rows)
+    t0, t1 = db_epoch(conn, rows[0][0]), db_epoch(conn, rows[-1][0])
+    t0, width, buckets = minmax_buckets(t0, t1, n)
+    out = conn.execute(db.SQL_SERIES_MINMAX.format(metric="pH"), {
+        "ts_from": rows[0][0], "ts_to": rows[-1][0], "t0": t0, "width": width, "buckets": buckets}).fetchall()
+    assert len(out) <= n
+    assert max(r[1] for r in out) == 14.0
+    assert min(r[1] for r in out) == min(v for _, v in rows)
+    assert [r[0] for r in out] == sorted(r[0] for r in out)
+
+
+def db_epoch(conn, ts):
+    return conn.execute("SELECT (julianday(?) - 2440587.5) * 86400.0", (ts,)).fetchone()[0]
+
+
+def test_parse_time_accepts_iso_and_epoch():
+    assert parse_time("2024-01-01T00:00:00Z").isoformat() == "2024-01-01T00:00:00"
+    assert parse_time("2024-01-01T05:30:00+05:30").isoformat() == "2024-01-01T00:00:00"
+    assert parse_time("1704067200").isoformat() == "2024-01-01T00:00:00"
+
+
+@pytest.mark.parametrize("value", ["2024", "0", "-5", "nan", "1e300", "yesterday", ""])
+def test_parse_time_rejects_ambiguous_and_out_of_range(value):
+    with pytest.raises(ValueError):
+        parse_time(value)
@@ -0,0 +1,69 @@
+import pytest
+
+service = pytest.importorskip("waterquality.service", reason="needs the app's dependencies (twilio)")
+from waterquality import alerts
+from waterquality.heartbeat import HeartbeatMonitor
+
+NOW = 1700000000
+
+
+@pytest.fixture
+def sms(temp_db, monkeypatch):
+    sent = []
+    monkeypatch.setattr(alerts, "send_sms_alert", lambda level, issues, ts: sent.append((level, issues, ts)))
+    return sent
+
+
+def test_batch_sms_names_the_reading_that_set_the_level(sms):
+    result = service.record_batch([
+        (1, NOW, 7.0, 0.1, 0.01, None),   # low chlorine -> CRITICAL
+        (1, NOW + 60, 9.5, 0.1, 0.5, None),  # pH -> HIGH, the latest reading
+        (2, NOW, 7.0, 0.1, 0.5, None),
+    ], now=NOW)
+    assert result == {"accepted": 3, "rejected": 0, "alerts": 1}
+    [(level, issues, ts)] = sms
+    assert level == "CRITICAL"
+    assert issues[0] == "Device 1: 2 of 2 readings alerting"
+    assert issues[1] == "Device 1: Low chlorine (0.01 mg/L)"
+    assert "Device 1: pH out of range (9.5)" in issues
+    assert ts == "2023-11-14T22:14:20.000000Z"
+
+
+def test_batch_sms_dedupes_and_caps_issues(sms):
+    records = [(5, NOW + i, 7.0, 0.1, 0.01, None) for i in range(20)]
+    records += [(5, NOW + 100 + i, 9.0 + i / 10, 0.1, 0.5, None) for i in range(10)]
+    service.record_batch(records, now=NOW)
+    [(level, issues, _)] = sms
+    assert level == "CRITICAL"
+    assert issues[1] == "Device 5: Low chlorine (0.01 mg/L)"
+    assert len(issues) == 2 + service.BATCH_SMS_MAX_ISSUES
+    assert issues[-1] == "Device 5: +6 more"
+
+
+def test_batch_rejects_out_of_range_epochs(sms, temp_db):
+    result = service.record_batch([(1, NOW - 30 * 86400, 7.0, 0.1, 0.5, None),
+                                   (1, NOW + 3600, 7.0, 0.1, 0.5, None),
+                                   (1, NOW, 7.0, 0.1, 0.5, None)], now=NOW)
+    assert result == {"accepted": 1, "rejected": 2, "alerts": 0}
+    assert temp_db.connect().execute("SELECT device_id FROM readings").fetchall() == [(1,)]
+
+
+def test_monitored_sites_are_stored_and_shared(sms, temp_db, monkeypatch):
+    monkeypatch.setattr(service, "heartbeat", HeartbeatMonitor(lambda *a: None))
+    service.watch_site("pune")
+    service.watch_site("device-1")
+    assert temp_db.get_monitored_sites() == ["device-1", "pune"]
+
+    before = temp_db.site_last_seen("device-1")
+    service.record_batch([(1, NOW, 7.0, 0.1, 0.5, None)], now=NOW)
+    assert temp_db.site_last_seen("device-1") > before
+
+    # One claim per silence, however many workers try.
+    assert temp_db.claim_site_alert("pune")
+    assert not temp_db.claim_site_alert("pune")
+    service.record_reading(7.0, 0.1, 0.5, None, site="pune")
+    assert temp_db.claim_site_alert("pune")
+
+    service.forget_site("pune")
+    assert temp_db.get_monitored_sites() == ["device-1"]
+    assert temp_db.site_last_seen("pune") is None
@@ -0,0 +1,13 @@
+# Shared data access, alert evaluation and serving helpers for the water
+# quality app. app.py and duplicate.py are thin Flask entry points on top:
+#
+#   db             - schema, migrations and every SQL query
+#   alerts         - thresholds, alert evaluation and SMS delivery
+#   response_cache - data-versioned response cache for the read APIs
+#   fastjson       - JSON provider and streaming GeoJSON writer
+#   heartbeat      - no-data detection for silent sensors
+#   rescore        - background re-scoring after threshold changes
+#   binary_ingest  - compact binary ingest format
+#   series         - downsampling for chart series
+#   service        - shared reading, batch and threshold handling
+#   views          - Flask blueprint with the routes both entry points share
@@ -0,0 +1,45 @@
+from twilio.rest import Client  # Twilio SMS
+
+DEFAULT_THRESH = {
+    "pH_low": 6.5,
+    "pH_high": 8.5,
+    "turbidity_high": 1.0,
+    "rfc_low": 0.2,
+}
+
+# --- Twilio Config ---
+TWILIO_ACCOUNT_SID = "your_account_sid"
+TWILIO_AUTH_TOKEN = "your_auth_token"
+TWILIO_PHONE_NUMBER = "+1234567890"  # Twilio sender
+TARGET_PHONE_NUMBER = "+91xxxxxxxxxx"  # Your number
+
+def send_sms_alert(level, issues, timestamp):
+    if level in ["CRITICAL", "HIGH"]:
+        body = f"🚨 Water Alert [{level}] at {timestamp}\n" + "\n".join(f"• {i}" for i in issues)
+        try:
+            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+            client.messages.create(
+                body=body,
+                from_=TWILIO_PHONE_NUMBER,
+                to=TARGET_PHONE_NUMBER
+            )
+        except Exception as e:
+            print("SMS failed:", e)
+
+def evaluate_alert(pH, turbidity, rfc, thresh):
+    issues = []
+    severity = "OK"
+    if pH is not None:
+        if pH < thresh["pH_low"] or pH > thresh["pH_high"]:
+            issues.append(f"pH out of range ({pH})")
+            severity = "HIGH"
+    if turbidity is not None:
+        if turbidity > thresh["turbidity_high"]:
+            issues.append(f"Turbidity high ({turbidity} NTU)")
+            if severity != "HIGH":
+                severity = "MEDIUM"
+    if rfc is not None:
+        if rfc < thresh["rfc_low"]:
+            issues.append(f"Low chlorine ({rfc} mg/L)")
+            severity = "CRITICAL"
+    return severity, issues
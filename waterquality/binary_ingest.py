@@ -0,0 +1,71 @@
+import math, struct, zlib
+
+# --- Compact binary ingest format ---
+# A batch is an 8-byte header followed by fixed 24-byte records, all
+# little-endian:
+#
+#   header: magic "WQ" | version u8 | flags u8 | record count u32
+#   record: device id u32 | epoch seconds u32 | pH f32 | turbidity f32 | rfc f32 | tds f32
+#
+# Flag bit 0 means the record block is zlib-compressed. A missing value is
+# sent as NaN; infinities are stored as missing too. Uncompressed batches
+# are parsed straight out of the request buffer through a memoryview,
+# without copying. A batch holds at most MAX_RECORDS records, and a
+# compressed block is never inflated past the size its count implies.
+
+MAGIC = b"WQ"
+VERSION = 1
+FLAG_ZLIB = 0x01
+HEADER = struct.Struct("<2sBBI")
+RECORD = struct.Struct("<IIffff")
+MAX_RECORDS = 50000
+# Largest uncompressed batch; used as the app's request size limit.
+MAX_BATCH_BYTES = HEADER.size + MAX_RECORDS * RECORD.size
+
+class BinaryIngestError(ValueError):
+    pass
+
+def _value(x):
+    # float32 -> Python float; drop float32 noise (7.2 -> 7.199999809...).
+    return round(x, 4) if math.isfinite(x) else None
+
+def decode_batch(data):
+    """Yield ``(device_id, epoch, pH, turbidity, rfc, tds)`` for each record in ``data``."""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise BinaryIngestError("truncated header")
+    magic, version, flags, count = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise BinaryIngestError("bad magic or unsupported version")
+    if count > MAX_RECORDS:
+        raise BinaryIngestError(f"batch of {count} records exceeds {MAX_RECORDS}")
+    body = view[HEADER.size:]
+    if flags & FLAG_ZLIB:
+        # Inflate at most one byte past the expected size, so a small body
+        # cannot expand into gigabytes before the size check below.
+        inflater = zlib.decompressobj()
+        try:
+            body = memoryview(inflater.decompress(body, count * RECORD.size + 1))
+        except zlib.error as e:
+            raise BinaryIngestError(f"bad compressed body: {e}")
+        if inflater.unconsumed_tail:
+            raise BinaryIngestError(f"compressed body larger than {count} records")
+    if len(body) != count * RECORD.size:
+        raise BinaryIngestError(f"expected {count} records, got {len(body)} bytes")
+    value = _value
+    for device_id, epoch, pH, turbidity, rfc, tds in RECORD.iter_unpack(body):
+        yield device_id, epoch, value(pH), value(turbidity), value(rfc), value(tds)
+
+def encode_batch(records, compress=False):
+    """Reference encoder: ``records`` are ``(device_id, epoch, pH, turbidity, rfc, tds)``, None for missing."""
+    nan = float("nan")
+    records = list(records)
+    body = bytearray(RECORD.size * len(records))
+    for i, (device_id, epoch, pH, turbidity, rfc, tds) in enumerate(records):
+        RECORD.pack_into(body, i * RECORD.size, device_id, int(epoch),
+                         *(nan if v is None else v for v in (pH, turbidity, rfc, tds)))
+    flags = 0
+    if compress:
+        body = zlib.compress(body, 6)
+        flags |= FLAG_ZLIB
+    return HEADER.pack(MAGIC, VERSION, flags, len(records)) + bytes(body)
@@ -0,0 +1,267 @@
+import queue, sqlite3, threading, time
+from datetime import datetime
+from .alerts import DEFAULT_THRESH, evaluate_alert
+
+# --- Data access ---
+# The one implementation of every query used by app.py and duplicate.py.
+# Connections come from a small pool and outlive the threads that use
+# them: Werkzeug's dev server runs each request on a new thread, so a
+# per-thread connection would be opened (and its statements compiled) on
+# every request. A thread borrows one connection on first use and returns
+# it when the thread exits, so SQLite's per-connection statement cache
+# turns the fixed SQL strings below into prepared statements that are
+# reused across requests. Long streaming reads get their own connection
+# that is closed when the iterator finishes. Point lookups and
+# bulk reads return plain tuples: they are the cheapest row type, and the
+# templates and GeoJSON writer index them by position.
+
+DB_PATH = "readings.db"
+
+READING_COLS = "ts, pH, turbidity, rfc, tds, status, lat, lon"
+SERIES_METRICS = ("pH", "turbidity", "rfc", "tds")
+
+SQL_INSERT = f"INSERT INTO readings ({READING_COLS}, device_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_LAST = f"SELECT {READING_COLS} FROM readings ORDER BY id DESC LIMIT ?"
+SQL_ALL = f"SELECT {READING_COLS} FROM readings ORDER BY id DESC"
+SQL_LOCATED = (f"SELECT {READING_COLS} FROM readings "
+               "WHERE lat IS NOT NULL AND lon IS NOT NULL ORDER BY id DESC")
+# Epoch seconds are computed by SQLite so series rows need no parsing.
+SQL_SERIES = ("SELECT (julianday(ts) - 2440587.5) * 86400.0, {metric}, ts, status FROM readings "
+              "WHERE ts >= ? AND ts <= ? AND {metric} IS NOT NULL ORDER BY ts")
+# Min/max downsampling in one statement. SQLite returns the other columns
+# of a MIN()/MAX() aggregate from the row holding that extreme, so each
+# GROUP BY yields one row id per bucket; only those rows are then fetched.
+# Grouping carries ids rather than ts/status text, which keeps the sorts
+# small. The bucket index is clamped to [0, buckets - 1].
+SQL_SERIES_MINMAX = (
+    "WITH b AS (SELECT id, {metric} AS v, "
+    "           MAX(MIN(CAST(((julianday(ts) - 2440587.5) * 86400.0 - :t0) / :width AS INTEGER), "
+    "               :buckets - 1), 0) AS bucket "
+    "           FROM readings WHERE ts >= :ts_from AND ts <= :ts_to AND {metric} IS NOT NULL) "
+    "SELECT (julianday(ts) - 2440587.5) * 86400.0, {metric}, ts, status FROM readings "
+    "WHERE id IN (SELECT id FROM (SELECT MIN(v), id FROM b GROUP BY bucket) "
+    "             UNION ALL SELECT id FROM (SELECT MAX(v), id FROM b GROUP BY bucket)) "
+    "ORDER BY ts")
+# Heartbeat sites. last_seen/alerted are wall-clock epoch seconds shared by
+# every process: last_seen is bumped with each reading from the site, and an
+# alert is claimed by setting alerted, which only succeeds once per silence.
+SQL_SITES = "SELECT site FROM monitored_sites ORDER BY site"
+SQL_ADD_SITE = "INSERT OR IGNORE INTO monitored_sites (site, last_seen) VALUES (?, ?)"
+SQL_REMOVE_SITE = "DELETE FROM monitored_sites WHERE site = ?"
+SQL_SITE_SEEN = "UPDATE monitored_sites SET last_seen = ? WHERE site = ?"
+SQL_SITE_LAST_SEEN = "SELECT last_seen FROM monitored_sites WHERE site = ?"
+SQL_CLAIM_ALERT = ("UPDATE monitored_sites SET alerted = ? "
+                   "WHERE site = ? AND (alerted IS NULL OR alerted < last_seen)")
+SQL_THRESH = "SELECT key, value FROM thresholds"
+SQL_SET_THRESH = "UPDATE thresholds SET value = ? WHERE key = ?"
+# Every write bumps this counter in its own transaction. Response caches
+# compare it, so a write from any process or thread invalidates them.
+SQL_BUMP_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'data_version'"
+SQL_VERSION = "SELECT value FROM meta WHERE key = 'data_version'"
+
+POOL_SIZE = 8  # idle connections kept; more threads than this open extras
+
+_local = threading.local()
+_pool = queue.LifoQueue(POOL_SIZE)  # (path, connection); LIFO keeps warm ones in use
+
+def _open():
+    # A pooled connection moves between threads but is only ever used by
+    # the one thread currently holding it.
+    conn = sqlite3.connect(DB_PATH, timeout=5.0, cached_statements=64, check_same_thread=False)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class _Lease:
+    # Lives in the thread's local storage; dropped (and the connection
+    # returned) when the thread exits or DB_PATH changes.
+    __slots__ = ("conn", "path")
+
+    def __init__(self, conn, path):
+        self.conn = conn
+        self.path = path
+
+    def __del__(self):
+        try:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            if self.path == DB_PATH:
+                _pool.put_nowait((self.path, self.conn))
+                return
+        except Exception:  # queue.Full, or interpreter shutdown
+            pass
+        self.conn.close()
+
+def _acquire():
+    while True:
+        try:
+            path, conn = _pool.get_nowait()
+        except queue.Empty:
+            return _open()
+        if path == DB_PATH:
+            return conn
+        conn.close()
+
+def connect():
+    """Return this thread's connection to ``DB_PATH``, borrowing one from the pool if needed."""
+    lease = getattr(_local, "lease", None)
+    if lease is None or lease.path != DB_PATH:
+        _local.lease = None  # returns or closes the old connection
+        lease = _local.lease = _Lease(_acquire(), DB_PATH)
+    return lease.conn
+
+def _stream(sql, params=()):
+    conn = _open()
+    try:
+        yield from conn.execute(sql, params)
+    finally:
+        conn.close()
+
+def init_db():
+    conn = connect()
+    c = conn.cursor()
+    # WAL lets readers and the writer work concurrently; it is stored in the file.
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS readings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT,
+            pH REAL,
+            turbidity REAL,
+            rfc REAL,
+            tds REAL,
+            status TEXT,
+            lat REAL,
+            lon REAL,
+            device_id INTEGER
+        );
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS thresholds (
+            key TEXT PRIMARY KEY,
+            value REAL
+        );
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        );
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS monitored_sites (
+            site TEXT PRIMARY KEY,
+            last_seen REAL,
+            alerted REAL
+        );
+    """)
+    c.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+    # --- Simple migration: add lat/lon/device_id to databases created without them ---
+    c.execute("PRAGMA table_info(readings)")
+    cols = {row[1] for row in c.fetchall()}
+    if "lat" not in cols:
+        c.execute("ALTER TABLE readings ADD COLUMN lat REAL")
+    if "lon" not in cols:
+        c.execute("ALTER TABLE readings ADD COLUMN lon REAL")
+    if "device_id" not in cols:
+        c.execute("ALTER TABLE readings ADD COLUMN device_id INTEGER")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_readings_ts ON readings (ts)")
+    for k, v in DEFAULT_THRESH.items():
+        c.execute("INSERT OR IGNORE INTO thresholds (key, value) VALUES (?, ?)", (k, v))
+    conn.commit()
+
+def get_thresholds():
+    # Read on every call: another process may have changed them.
+    return dict(connect().execute(SQL_THRESH).fetchall())
+
+def update_thresholds(new_values):
+    with connect() as conn:
+        conn.executemany(SQL_SET_THRESH, [(v, k) for k, v in new_values.items()])
+        conn.execute(SQL_BUMP_VERSION)
+
+def save_reading(pH, turbidity, rfc, tds, lat, lon, site=None):
+    """Score and store one reading now; returns ``(ts, level, issues)``."""
+    ts = datetime.utcnow().isoformat(timespec="microseconds") + "Z"
+    (level, issues), = save_scored([(ts, pH, turbidity, rfc, tds, lat, lon, None)], [site] if site else ())
+    return ts, level, issues
+
+def save_scored(readings, sites=()):
+    """Score and insert ``(ts, pH, turbidity, rfc, tds, lat, lon, device_id)`` rows; returns ``[(level, issues)]``.
+
+    Monitored ``sites`` the readings came from are marked as seen in the same transaction.
+    """
+    # The write lock is taken before the thresholds are read. A concurrent
+    # threshold change therefore either commits first and is used here, or
+    # waits for these rows and then re-scores them with everything else.
+    conn = connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        thresh = dict(conn.execute(SQL_THRESH).fetchall())
+        results, rows = [], []
+        for ts, pH, turbidity, rfc, tds, lat, lon, device_id in readings:
+            level, issues = evaluate_alert(pH, turbidity, rfc, thresh)
+            results.append((level, issues))
+            rows.append((ts, pH, turbidity, rfc, tds, level, lat, lon, device_id))
+        conn.executemany(SQL_INSERT, rows)
+        conn.execute(SQL_BUMP_VERSION)
+        now = time.time()
+        conn.executemany(SQL_SITE_SEEN, [(now, site) for site in sites])
+    return results
+
+def save_readings(rows):
+    # Batch insert in one transaction; rows are (ts, pH, turbidity, rfc, tds, status, lat, lon, device_id).
+    with connect() as conn:
+        conn.executemany(SQL_INSERT, rows)
+        conn.execute(SQL_BUMP_VERSION)
+
+def get_monitored_sites():
+    return [row[0] for row in connect().execute(SQL_SITES)]
+
+def add_monitored_site(site):
+    with connect() as conn:
+        conn.execute(SQL_ADD_SITE, (site, time.time()))
+
+def remove_monitored_site(site):
+    with connect() as conn:
+        conn.execute(SQL_REMOVE_SITE, (site,))
+
+def site_last_seen(site):
+    """Epoch seconds of the last reading from ``site``, or None if it is not monitored."""
+    row = connect().execute(SQL_SITE_LAST_SEEN, (site,)).fetchone()
+    return row[0] if row else None
+
+def claim_site_alert(site):
+    """Mark ``site`` as alerted; False if another process already did for this silence."""
+    with connect() as conn:
+        return conn.execute(SQL_CLAIM_ALERT, (time.time(), site)).rowcount == 1
+
+def data_version():
+    return connect().execute(SQL_VERSION).fetchone()[0]
+
+def get_last_readings(limit=10):
+    return connect().execute(SQL_LAST, (limit,)).fetchall()
+
+def iter_readings():
+    return _stream(SQL_ALL)
+
+def iter_located_readings():
+    return _stream(SQL_LOCATED)
+
+def iter_series(metric, ts_from, ts_to):
+    # Range scan on idx_readings_ts; `metric` must come from SERIES_METRICS.
+    if metric not in SERIES_METRICS:
+        raise ValueError(f"unknown metric {metric!r}")
+    return _stream(SQL_SERIES.format(metric=metric), (ts_from, ts_to))
+
+def iter_series_minmax(metric, ts_from, ts_to, t0, width, buckets):
+    # Same range scan as iter_series, bucketed by SQLite; see SQL_SERIES_MINMAX.
+    if metric not in SERIES_METRICS:
+        raise ValueError(f"unknown metric {metric!r}")
+    return _stream(SQL_SERIES_MINMAX.format(metric=metric), {
+        "ts_from": ts_from, "ts_to": ts_to, "t0": t0, "width": width, "buckets": buckets})
+
+def get_time_range():
+    # Two queries so each is a single index seek.
+    conn = connect()
+    first = conn.execute("SELECT MIN(ts) FROM readings").fetchone()[0]
+    last = conn.execute("SELECT MAX(ts) FROM readings").fetchone()[0]
+    return first, last
@@ -0,0 +1,107 @@
+import math
+from json.encoder import encode_basestring_ascii
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # optional, much faster than the stdlib encoder
+except ImportError:
+    orjson = None
+
+# --- Fast JSON output ---
+# FastJSONProvider plugs orjson into Flask's jsonify when it is installed and
+# falls back to the stdlib provider otherwise. The GeoJSON writer below does
+# not go through either: it formats each feature straight from a DB row
+# tuple, so no per-feature dicts are built, and yields the collection in
+# chunks so large maps can be streamed.
+
+class FastJSONProvider(DefaultJSONProvider):
+    # orjson always writes UTF-8. Set this back to True to get the stdlib's
+    # \uXXXX escapes; that, keyword arguments, and anything orjson cannot
+    # encode (non-str keys, ints over 64 bits) use the stdlib provider.
+    # loads() is the stdlib's: request bodies here are small, and orjson
+    # would round big ints to floats and reject NaN.
+    ensure_ascii = False
+
+    def _orjson_dumps(self, obj):
+        if orjson is None or self.ensure_ascii:
+            return None
+        # Datetimes go through self.default, which formats them as HTTP dates.
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        data = None if kwargs else self._orjson_dumps(obj)
+        if data is None:
+            return super().dumps(obj, **kwargs)
+        return data.decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        data = None if self._app.debug else self._orjson_dumps(obj)
+        if data is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def _num(x):
+    if x is None or (isinstance(x, float) and not math.isfinite(x)):
+        return "null"
+    return repr(x)
+
+def _str(x):
+    return "null" if x is None else encode_basestring_ascii(x)
+
+def _value(x):
+    return _str(x) if isinstance(x, str) else _num(x)
+
+def _numbers(col):
+    # orjson formats a whole column in one call (None/NaN/inf become null).
+    # SQLite columns are not strictly typed, so a stray text value may hold a
+    # comma; if the split does not give one item per value, or orjson rejects
+    # a value, the column is encoded one value at a time instead.
+    if orjson is not None:
+        try:
+            out = orjson.dumps(col).decode("utf-8")[1:-1].split(",")
+        except TypeError:
+            out = None
+        if out is not None and len(out) == len(col):
+            return out
+    return [_value(x) for x in col]
+
+FEATURE = ('{"type":"Feature","geometry":{"type":"Point","coordinates":[%s,%s]},'
+           '"properties":{"ts":%s,"pH":%s,"turbidity":%s,"rfc":%s,"tds":%s,"status":%s}}')
+
+def encode_features(rows):
+    """Encode ``(ts, pH, turbidity, rfc, tds, status, lat, lon)`` rows as comma-joined features.
+
+    Rows are transposed into columns and each column is encoded in bulk.
+    """
+    ts, pH, turbidity, rfc, tds, status, lat, lon = zip(*rows)
+    return ",".join([FEATURE % f for f in zip(
+        _numbers(lon), _numbers(lat), map(_str, ts), _numbers(pH), _numbers(turbidity),
+        _numbers(rfc), _numbers(tds), map(_str, status))])
+
+def iter_feature_collection(rows, chunk_size=1000):
+    """Yield a GeoJSON FeatureCollection as UTF-8 chunks, ``chunk_size`` features each.
+
+    Rows without a location are skipped, as in the original /api/geojson.
+    """
+    yield b'{"type":"FeatureCollection","features":['
+    sep = ""
+    batch = []
+    for row in rows:
+        if row[6] is None or row[7] is None:
+            continue
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield (sep + encode_features(batch)).encode("utf-8")
+            sep = ","
+            batch = []
+    if batch:
+        yield (sep + encode_features(batch)).encode("utf-8")
+    yield b"]}"
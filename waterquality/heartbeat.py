@@ -0,0 +1,176 @@
+import threading, time
+from datetime import datetime
+
+# --- Sensor heartbeat monitor ---
+# Only sites registered with watch() are monitored; readings from any other
+# site are ignored, so typos and one-off senders never raise alerts. Each
+# monitored site has a last-seen time kept in memory, and a hashed timer
+# wheel holds one pending check per site. Recording a reading only updates
+# the last-seen time (O(1)); the wheel entry is left where it is and, when
+# it fires, is either re-armed for the new deadline or raised as "no data".
+# A wheel entry can be at most (slots - 1) ticks ahead, so a site is
+# re-armed about timeout / ((slots - 1) * tick) times per timeout period
+# (about 7 with the defaults), no matter how often it reports.
+#
+# The in-memory last-seen times only cover readings this process handled.
+# When other processes also take readings, pass ``check``: before a site is
+# reported, ``check(site)`` returns how many seconds ago the site was last
+# seen anywhere, or None if it is no longer monitored, and the site is
+# re-armed or dropped instead of reported.
+
+class HeartbeatMonitor:
+    def __init__(self, on_missing, timeout=3600, tick=1.0, slots=512, max_sites=50000, check=None):
+        self.on_missing = on_missing
+        self.check = check
+        self.timeout = timeout
+        self.tick = tick
+        self.slots = slots
+        self.max_sites = max_sites
+        self._wheel = [set() for _ in range(slots)]
+        self._last_seen = {}   # monitored site -> monotonic time of last reading
+        self._armed = set()    # sites with an entry somewhere in the wheel
+        self._alerted = set()  # sites already reported as missing
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._started = time.monotonic()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _slot_for(self, deadline):
+        # Deadlines further out than one rotation land in an earlier slot and
+        # are simply re-armed when that slot fires.
+        ticks = max(1, int((deadline - self._started) / self.tick) - self._cursor)
+        ticks = min(ticks, self.slots - 1)
+        return (self._cursor + ticks) % self.slots
+
+    def _arm(self, site, deadline):
+        # An existing entry re-arms itself from the last-seen time when it fires.
+        if site not in self._armed:
+            self._armed.add(site)
+            self._wheel[self._slot_for(deadline)].add(site)
+
+    def watch(self, site, now=None):
+        """Start monitoring ``site``; the timeout counts from now until it reports."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if site in self._last_seen:
+                return
+            if len(self._last_seen) >= self.max_sites:
+                raise ValueError(f"heartbeat already monitors {self.max_sites} sites")
+            self._last_seen[site] = now
+            self._arm(site, now + self.timeout)
+
+    def forget(self, site):
+        with self._lock:
+            self._last_seen.pop(site, None)
+            self._alerted.discard(site)
+
+    def sites(self):
+        with self._lock:
+            return sorted(self._last_seen)
+
+    def touch(self, site, now=None):
+        """Record a reading from ``site``; unmonitored sites are ignored."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if site not in self._last_seen:
+                return
+            self._last_seen[site] = now
+            if site in self._alerted:
+                self._alerted.discard(site)
+                self._arm(site, now + self.timeout)
+
+    def advance(self, now=None):
+        """Move the wheel up to ``now`` and fire any expired checks."""
+        now = time.monotonic() if now is None else now
+        target = int((now - self._started) / self.tick)
+        expired = []
+        with self._lock:
+            while self._cursor < target:
+                self._cursor += 1
+                slot = self._cursor % self.slots
+                due = self._wheel[slot]
+                if not due:
+                    continue
+                self._wheel[slot] = set()
+                for site in due:
+                    self._armed.discard(site)
+                    last = self._last_seen.get(site)
+                    if last is None or site in self._alerted:
+                        continue
+                    deadline = last + self.timeout
+                    if deadline <= now:
+                        expired.append(site)
+                    else:
+                        self._arm(site, deadline)
+        missing = []
+        for site in expired:
+            seen_ago = self._check(site, now)
+            with self._lock:
+                last = self._last_seen.get(site)
+                if last is None or site in self._alerted:
+                    continue
+                if seen_ago is None:
+                    self._last_seen.pop(site)
+                    continue
+                last = max(last, now - seen_ago)
+                self._last_seen[site] = last
+                if last + self.timeout > now:
+                    self._arm(site, last + self.timeout)
+                else:
+                    self._alerted.add(site)
+                    missing.append((site, now - last))
+        for site, silent_for in missing:
+            try:
+                self.on_missing(site, silent_for)
+            except Exception as e:
+                print("Heartbeat alert failed:", e)
+        return missing
+
+    def _check(self, site, now):
+        # Runs without the lock held; ``check`` may query the database.
+        if self.check is None:
+            return now - self._last_seen.get(site, now)
+        try:
+            return self.check(site)
+        except Exception as e:
+            print("Heartbeat check failed:", e)
+            return now - self._last_seen.get(site, now)
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "running": self.running,
+                "monitored": len(self._last_seen),
+                "missing": sorted(self._alerted),
+                "oldest_silence_s": max((now - t for t in self._last_seen.values()), default=0),
+            }
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            self.advance()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def make_no_data_alert(send_sms_alert):
+    """Adapt ``send_sms_alert`` into a ``HeartbeatMonitor`` callback."""
+    def on_missing(site, silent_for):
+        ts = datetime.utcnow().isoformat() + "Z"
+        minutes = int(silent_for // 60)
+        send_sms_alert("CRITICAL", [f"No data from {site} for {minutes} min"], ts)
+    return on_missing
@@ -0,0 +1,113 @@
+import sqlite3, threading, time
+from datetime import datetime
+from .db import SQL_BUMP_VERSION, SQL_THRESH
+
+# --- Historical re-scoring ---
+# After a threshold change the stored `status` of old readings is stale.
+# RescoreJob walks `readings` in id order (keyset pagination, so each chunk
+# is an index range scan), re-evaluates every row and rewrites only the rows
+# whose severity changed. Each chunk is its own short write transaction,
+# followed by a pause, so live /submit inserts are never blocked for long.
+# Rows above the max id seen at start were scored with the new thresholds:
+# db.save_scored reads them inside the insert's write transaction.
+# Starting a new run cancels the one in progress. Each run reads the
+# thresholds itself when it begins, so the run started last always uses
+# the latest committed values, whatever order concurrent updates finish in.
+
+class RescoreJob:
+    def __init__(self, evaluate, chunk_size=500, pause=0.02, retries=5):
+        self.evaluate = evaluate
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.retries = retries
+        self._lock = threading.Lock()   # serializes chunk writes and run hand-over
+        self._cancel = threading.Event()
+        self._progress = {"state": "idle"}
+        # Totals across runs, for monitoring and load tests.
+        self.runs = 0
+        self.lock_errors = 0   # 'database is locked' hits, retried or not
+        self.failures = 0      # runs that ended in an exception
+
+    def start(self, db_path):
+        """Re-score all readings against the stored thresholds, cancelling any active run."""
+        with self._lock:
+            # Under the write lock, so concurrent starts leave exactly one run
+            # alive and the cancelled one has no chunk write in flight.
+            self._cancel.set()
+            cancel = self._cancel = threading.Event()
+            self.runs += 1
+            progress = self._progress = {
+                "state": "running", "scanned": 0, "changed": 0, "last_id": 0, "max_id": None,
+                "lock_errors": 0, "started": datetime.utcnow().isoformat() + "Z", "finished": None,
+            }
+        t = threading.Thread(target=self._run, args=(db_path, cancel, progress),
+                             name="rescore", daemon=True)
+        t.start()
+        return t
+
+    def cancel(self):
+        self._cancel.set()
+
+    def status(self):
+        p = dict(self._progress)
+        if p.get("max_id"):
+            p["percent"] = round(100.0 * p["last_id"] / p["max_id"], 1)
+        return p
+
+    def _run(self, db_path, cancel, progress):
+        conn = sqlite3.connect(db_path, timeout=1.0)
+        try:
+            thresh = dict(conn.execute(SQL_THRESH).fetchall())
+            progress["max_id"] = conn.execute("SELECT MAX(id) FROM readings").fetchone()[0] or 0
+            last_id = 0
+            while not cancel.is_set():
+                rows = conn.execute("""SELECT id, pH, turbidity, rfc, status FROM readings
+                                       WHERE id > ? AND id <= ? ORDER BY id LIMIT ?""",
+                                    (last_id, progress["max_id"], self.chunk_size)).fetchall()
+                if not rows:
+                    progress["state"] = "done"
+                    break
+                changes = []
+                for rid, pH, turbidity, rfc, status in rows:
+                    level, _ = self.evaluate(pH, turbidity, rfc, thresh)
+                    if level != status:
+                        changes.append((level, rid))
+                if changes and not self._write(conn, changes, cancel, progress):
+                    break
+                last_id = rows[-1][0]
+                progress["scanned"] += len(rows)
+                progress["changed"] += len(changes)
+                progress["last_id"] = last_id
+                time.sleep(self.pause)
+            if progress["state"] == "running":
+                progress["state"] = "cancelled"
+        except Exception as e:
+            self.failures += 1
+            progress["state"] = "failed"
+            progress["error"] = str(e)
+            print("Rescore failed:", e)
+        finally:
+            progress["finished"] = datetime.utcnow().isoformat() + "Z"
+            conn.close()
+
+    def _write(self, conn, changes, cancel, progress):
+        for attempt in range(self.retries):
+            with self._lock:
+                # Checked under the lock so a cancelled run never writes after
+                # the run that replaced it has started.
+                if cancel.is_set():
+                    return False
+                try:
+                    conn.executemany("UPDATE readings SET status = ? WHERE id = ?", changes)
+                    conn.execute(SQL_BUMP_VERSION)
+                    conn.commit()
+                    return True
+                except sqlite3.OperationalError as e:
+                    conn.rollback()
+                    if "locked" in str(e):
+                        self.lock_errors += 1
+                        progress["lock_errors"] += 1
+                    if "locked" not in str(e) or attempt == self.retries - 1:
+                        raise
+            time.sleep(self.pause * (attempt + 1))
+        return False
@@ -0,0 +1,94 @@
+import gzip, threading
+from collections import OrderedDict
+
+# --- Response cache for the read APIs ---
+# Entries hold the serialized body (and a gzip copy) for one endpoint +
+# query string. Every entry is tagged with the data version it was built
+# from. The version comes from the ``version`` callable, which reads a
+# counter that every write bumps in the database itself, so writes made by
+# other processes invalidate this cache too. Stale entries are never served
+# and simply age out of the LRU. A disabled cache stores, compresses and
+# serves nothing, so callers keep one code path.
+
+class CacheEntry:
+    __slots__ = ("version", "body", "gzip_body", "mimetype", "headers")
+
+    def __init__(self, version, body, mimetype, headers=None, gzip_body=None):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip_body
+        self.mimetype = mimetype
+        self.headers = headers or {}
+
+    @property
+    def size(self):
+        return len(self.body) + (len(self.gzip_body) if self.gzip_body else 0)
+
+
+class ResponseCache:
+    def __init__(self, version, max_bytes=64 * 1024 * 1024, max_entry_bytes=16 * 1024 * 1024,
+                 compress_min=1024, enabled=True):
+        self.version = version
+        self.enabled = enabled
+        self.compress_min = compress_min
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, mimetype, headers=None):
+        """Store ``body`` built from data ``version`` and return its entry.
+
+        Oversized bodies, and every body while the cache is disabled, are
+        returned without being stored or compressed.
+        ``version`` must be read before the data the body was built from, so
+        a write that lands mid-build leaves the entry already stale.
+        """
+        if not self.enabled or len(body) > self.max_entry_bytes:
+            return CacheEntry(version, body, mimetype, headers)
+        gzip_body = gzip.compress(body, 5) if len(body) >= self.compress_min else None
+        entry = CacheEntry(version, body, mimetype, headers, gzip_body)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"enabled": self.enabled, "entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def request_key(endpoint, request):
+    return (endpoint, request.query_string)
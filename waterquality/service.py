@@ -0,0 +1,121 @@
+import threading, time
+from datetime import datetime
+from . import alerts, db
+from .heartbeat import HeartbeatMonitor, make_no_data_alert
+from .response_cache import ResponseCache
+from .rescore import RescoreJob
+
+# --- Shared application logic ---
+# Everything a route does beyond parsing its request and shaping its
+# response lives here, so app.py, duplicate.py and the shared blueprint all
+# get the same evaluation, storage, alerting, heartbeat, cache and rescore
+# behaviour. The background helpers are per process.
+
+HEARTBEAT_TIMEOUT_S = 60 * 60  # raise "no data" if a site is silent this long
+# Binary readings stamped outside [now - max age, now + max skew] are
+# rejected: they are gateway clock errors or replays, not live data.
+INGEST_MAX_AGE_S = 7 * 24 * 60 * 60
+INGEST_MAX_SKEW_S = 10 * 60
+BATCH_SMS_MAX_ISSUES = 5  # issue lines per device in a batch summary SMS
+
+def _send_sms(level, issues, ts):
+    # Looked up on every call so the SMS backend can be swapped (e.g. load tests).
+    alerts.send_sms_alert(level, issues, ts)
+
+_no_data_alert = make_no_data_alert(_send_sms)
+
+def _on_missing(site, silent_for):
+    # Every process runs its own monitor; only the first to claim the alert sends it.
+    if db.claim_site_alert(site):
+        _no_data_alert(site, silent_for)
+
+def _site_silence(site):
+    last = db.site_last_seen(site)
+    return None if last is None else time.time() - last
+
+heartbeat = HeartbeatMonitor(_on_missing, timeout=HEARTBEAT_TIMEOUT_S, check=_site_silence)
+response_cache = ResponseCache(db.data_version)
+rescorer = RescoreJob(alerts.evaluate_alert)
+_background_lock = threading.Lock()
+
+def start_background():
+    """Ensure the schema, load the monitored sites and start the heartbeat, once per process."""
+    if heartbeat.running:
+        return
+    with _background_lock:
+        if not heartbeat.running:
+            db.init_db()
+            for site in db.get_monitored_sites():
+                heartbeat.watch(site)
+            heartbeat.start()
+
+def watch_site(site):
+    heartbeat.watch(site)  # raises ValueError when the monitor is full
+    db.add_monitored_site(site)
+
+def forget_site(site):
+    db.remove_monitored_site(site)
+    heartbeat.forget(site)
+
+def site_key(name):
+    """Normalize a free-text site name (e.g. a city) for the heartbeat monitor."""
+    return name.strip().lower() if name else None
+
+def to_float(x):
+    if x in (None, ""):
+        return None
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+def record_reading(pH, turbidity, rfc, tds, lat=None, lon=None, site=None):
+    """Evaluate, store and alert on one reading; returns ``(level, issues)``."""
+    ts, level, issues = db.save_reading(pH, turbidity, rfc, tds, lat, lon, site)
+    heartbeat.touch(site)
+    if level in ["CRITICAL", "HIGH"]:
+        _send_sms(level, issues, ts)
+    return level, issues
+
+def record_batch(records, now=None):
+    """Store decoded binary records ``(device_id, epoch, pH, turbidity, rfc, tds)``; one SMS per alerting device."""
+    now = time.time() if now is None else now
+    oldest, newest = now - INGEST_MAX_AGE_S, now + INGEST_MAX_SKEW_S
+    rows, rejected = [], 0
+    for device_id, epoch, pH, turbidity, rfc, tds in records:
+        if not oldest <= epoch <= newest:
+            rejected += 1
+            continue
+        # Same fixed-width format as form readings, so ts sorts as text.
+        ts = datetime.utcfromtimestamp(epoch).isoformat(timespec="microseconds") + "Z"
+        rows.append((ts, pH, turbidity, rfc, tds, None, None, device_id))
+    scored = db.save_scored(rows, {f"device-{row[7]}" for row in rows}) if rows else []
+    totals, alerting = {}, {}
+    for row, (level, issues) in zip(rows, scored):
+        device_id = row[7]
+        totals[device_id] = totals.get(device_id, 0) + 1
+        if level in ["CRITICAL", "HIGH"]:
+            alerting.setdefault(device_id, []).append((row[0], level, issues))
+    for device_id in totals:
+        heartbeat.touch(f"device-{device_id}")
+    for device_id, hits in alerting.items():
+        level = "CRITICAL" if any(h[1] == "CRITICAL" for h in hits) else "HIGH"
+        # Issues from the worst readings come first, so the reason for the
+        # level is always named; repeats are dropped and the rest is capped.
+        issues = list(dict.fromkeys(i for h in sorted(hits, key=lambda h: h[1] != level) for i in h[2]))
+        extra = len(issues) - BATCH_SMS_MAX_ISSUES
+        lines = [f"Device {device_id}: {len(hits)} of {totals[device_id]} readings alerting"]
+        lines += [f"Device {device_id}: {i}" for i in issues[:BATCH_SMS_MAX_ISSUES]]
+        if extra > 0:
+            lines.append(f"Device {device_id}: +{extra} more")
+        _send_sms(level, lines, max(h[0] for h in hits))
+    return {"accepted": len(rows), "rejected": rejected, "alerts": len(alerting)}
+
+def change_thresholds(new_values):
+    """Apply the values that differ from the stored thresholds; returns them."""
+    current = db.get_thresholds()
+    changed = {k: v for k, v in new_values.items() if current.get(k) != v}
+    if changed:
+        db.update_thresholds(changed)
+        rescorer.start(db.DB_PATH)
+    return changed
@@ -0,0 +1,173 @@
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, request, session, url_for
+from . import db, service
+from .binary_ingest import decode_batch, BinaryIngestError, MAX_BATCH_BYTES
+from .fastjson import iter_feature_collection
+from .response_cache import request_key
+from .series import MODES, lttb, minmax_buckets, parse_time, epoch
+
+# --- Routes shared by app.py and duplicate.py ---
+# Both entry points register this blueprint, so exports, map data, charts,
+# threshold updates, binary ingest and status APIs behave identically in
+# each. Each entry point keeps only its own dashboard page and form submit,
+# and builds those on cached_page and service.record_reading.
+
+bp = Blueprint("wq", __name__)
+
+@bp.record_once
+def _setup(state):
+    # The first request a process serves creates or migrates the schema and
+    # starts the heartbeat (service.start_background), so this also works
+    # under WSGI servers, not only under __main__. A multi-process server
+    # runs one monitor per worker. The workers share last-seen times and
+    # alert claims through the monitored_sites table, so a site is reported
+    # once, and only if no worker has stored a reading from it. A site added
+    # through the API is watched by the worker that added it, and by every
+    # worker after a restart.
+    state.app.before_request(service.start_background)
+    # Cap request bodies (Flask answers 413) unless the app set its own limit.
+    if state.app.config.get("MAX_CONTENT_LENGTH") is None:
+        state.app.config["MAX_CONTENT_LENGTH"] = MAX_BATCH_BYTES
+
+def cached_response(entry):
+    if entry.gzip_body is not None and "gzip" in request.accept_encodings:
+        resp = Response(entry.gzip_body, mimetype=entry.mimetype, headers=entry.headers)
+        resp.headers["Content-Encoding"] = "gzip"
+    else:
+        resp = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+def stream_and_cache(key, version, chunks, mimetype, headers=None):
+    # Stream the body; keep a copy for the cache unless it grows too big.
+    cache = service.response_cache
+    def generate():
+        kept, size = ([] if cache.enabled else None), 0
+        for chunk in chunks:
+            if kept is not None:
+                kept.append(chunk); size += len(chunk)
+                if size > cache.max_entry_bytes: kept = None
+            yield chunk
+        if kept is not None:
+            cache.put(key, version, b"".join(kept), mimetype, headers)
+    return Response(generate(), mimetype=mimetype, headers=headers)
+
+def cached_page(endpoint, render):
+    """Serve ``render()`` (an HTML string) through the response cache."""
+    # Pages carrying flash messages are per-user, so they bypass the cache.
+    cacheable = "_flashes" not in session
+    key = request_key(endpoint, request)
+    if cacheable:
+        entry = service.response_cache.get(key)
+        if entry is not None:
+            return cached_response(entry)
+    version = db.data_version()
+    html = render()
+    if not cacheable:
+        return html
+    return cached_response(service.response_cache.put(key, version, html.encode("utf-8"), "text/html"))
+
+@bp.route("/update_thresholds", methods=["POST"])
+def update_thresholds():
+    new_vals = {}
+    for key in ["pH_low", "pH_high", "turbidity_high", "rfc_low"]:
+        value = service.to_float(request.form.get(key))
+        if value is not None:
+            new_vals[key] = value
+    if service.change_thresholds(new_vals):
+        flash("Thresholds updated ✅, re-scoring past readings", "OK")
+    else:
+        flash("Thresholds unchanged", "OK")
+    return redirect(url_for("index"))
+
+@bp.route("/export_csv")
+@bp.route("/export")
+def export_csv():
+    headers = {"Content-Disposition": "attachment;filename=readings.csv"}
+    key = request_key("export_csv", request)
+    entry = service.response_cache.get(key)
+    if entry is not None:
+        return cached_response(entry)
+    version = db.data_version()
+    rows = db.iter_readings()
+    def generate():
+        yield b"Timestamp,pH,Turbidity,Chlorine,TDS,Status,Lat,Lon\n"
+        for row in rows:
+            yield (",".join([str(x) if x is not None else "" for x in row]) + "\n").encode("utf-8")
+    return stream_and_cache(key, version, generate(), "text/csv", headers)
+
+@bp.route("/api/geojson")
+@bp.route("/api/readings.geojson")
+def geojson():
+    key = request_key("geojson", request)
+    entry = service.response_cache.get(key)
+    if entry is not None:
+        return cached_response(entry)
+    version = db.data_version()
+    return stream_and_cache(key, version, iter_feature_collection(db.iter_located_readings()), "application/json")
+
+@bp.route("/api/series")
+def series():
+    metric = request.args.get("metric", "rfc")
+    mode = request.args.get("mode", "lttb")
+    if metric not in db.SERIES_METRICS or mode not in MODES:
+        return jsonify({"error": f"metric must be one of {db.SERIES_METRICS}, mode one of {MODES}"}), 400
+    key = request_key("series", request)
+    entry = service.response_cache.get(key)
+    if entry is not None:
+        return cached_response(entry)
+    version = db.data_version()
+    try:
+        points = min(max(int(request.args.get("points", 1000)), 3), 10000)
+        first, last = db.get_time_range()
+        t_from = parse_time(request.args.get("from") or first or "1970-01-01")
+        t_to = parse_time(request.args.get("to") or last or "1970-01-01")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if t_to < t_from:
+        return jsonify({"error": "'to' is earlier than 'from'"}), 400
+    # Stored timestamps look like 2024-01-01T00:00:00.123456Z, so a bound
+    # without the "Z" sorts before every reading in that second.
+    ts_from, ts_to = t_from.isoformat(), t_to.isoformat() + "Z"
+    e_from, e_to = epoch(t_from.isoformat()), epoch(t_to.isoformat())
+    if mode == "minmax":
+        rows = db.iter_series_minmax(metric, ts_from, ts_to, *minmax_buckets(e_from, e_to, points))
+    else:
+        rows = lttb(db.iter_series(metric, ts_from, ts_to), e_from, e_to, points)
+    data = [[ts, v, status] for _, v, ts, status in rows]
+    body = current_app.json.dumps({"metric": metric, "mode": mode, "from": t_from.isoformat() + "Z",
+                                   "to": t_to.isoformat() + "Z", "points": data}).encode("utf-8")
+    return cached_response(service.response_cache.put(key, version, body, "application/json"))
+
+@bp.route("/ingest/bin", methods=["POST"])
+def ingest_binary():
+    # Compact batch upload for field gateways; see binary_ingest.py for the layout.
+    try:
+        records = list(decode_batch(request.get_data(cache=False)))
+    except BinaryIngestError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(service.record_batch(records))
+
+@bp.route("/api/rescore")
+def rescore_status():
+    return jsonify(service.rescorer.status())
+
+@bp.route("/api/heartbeat")
+def heartbeat_status():
+    return jsonify(service.heartbeat.status())
+
+@bp.route("/api/heartbeat/sites", methods=["GET", "POST"])
+def heartbeat_sites():
+    if request.method == "POST":
+        site = service.site_key((request.get_json(silent=True) or request.form).get("site"))
+        if not site:
+            return jsonify({"error": "site is required"}), 400
+        try:
+            service.watch_site(site)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify({"sites": db.get_monitored_sites()})
+
+@bp.route("/api/heartbeat/sites/<path:site>", methods=["DELETE"])
+def heartbeat_forget(site):
+    service.forget_site(service.site_key(site))
+    return jsonify({"sites": db.get_monitored_sites()})